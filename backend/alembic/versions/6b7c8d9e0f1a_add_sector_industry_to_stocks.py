@@ -8,7 +8,6 @@ Create Date: 2025-10-09 18:00:00.000000
 from typing import Sequence, Union
 
 from alembic import op
-import sqlalchemy as sa
 
 
 # revision identifiers, used by Alembic.
@@ -19,14 +18,18 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # Add sector and industry columns to stocks table
-    op.add_column('stocks', sa.Column('sector', sa.String(length=100), nullable=True))
-    op.add_column('stocks', sa.Column('industry', sa.String(length=100), nullable=True))
+    # Add sector and industry columns to stocks table in a single ALTER TABLE
+    op.execute(
+        "ALTER TABLE stocks "
+        "ADD COLUMN sector varchar(100), "
+        "ADD COLUMN industry varchar(100)"
+    )
 
 
 def downgrade() -> None:
     # Remove sector and industry columns from stocks table
-    op.drop_column('stocks', 'industry')
-    op.drop_column('stocks', 'sector')
-
-
+    op.execute(
+        "ALTER TABLE stocks "
+        "DROP COLUMN industry, "
+        "DROP COLUMN sector"
+    )
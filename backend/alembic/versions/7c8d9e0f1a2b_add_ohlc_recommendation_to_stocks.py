@@ -8,7 +8,6 @@ Create Date: 2025-10-09 19:00:00.000000
 from typing import Sequence, Union
 
 from alembic import op
-import sqlalchemy as sa
 
 
 # revision identifiers, used by Alembic.
@@ -19,24 +18,29 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # Add OHLC and recommendation columns to stocks table
-    op.add_column('stocks', sa.Column('open_price', sa.Float(), nullable=True))
-    op.add_column('stocks', sa.Column('high_price', sa.Float(), nullable=True))
-    op.add_column('stocks', sa.Column('low_price', sa.Float(), nullable=True))
-    op.add_column('stocks', sa.Column('volume', sa.Float(), nullable=True))
-    op.add_column('stocks', sa.Column('change', sa.Float(), nullable=True))
-    op.add_column('stocks', sa.Column('change_percent', sa.Float(), nullable=True))
-    op.add_column('stocks', sa.Column('recommendation', sa.String(length=50), nullable=True))
+    # Add OHLC and recommendation columns to stocks table in a single
+    # ALTER TABLE so the lock and catalog update happen once
+    op.execute(
+        "ALTER TABLE stocks "
+        "ADD COLUMN open_price double precision, "
+        "ADD COLUMN high_price double precision, "
+        "ADD COLUMN low_price double precision, "
+        "ADD COLUMN volume double precision, "
+        "ADD COLUMN change double precision, "
+        "ADD COLUMN change_percent double precision, "
+        "ADD COLUMN recommendation varchar(50)"
+    )
 
 
 def downgrade() -> None:
     # Remove OHLC and recommendation columns from stocks table
-    op.drop_column('stocks', 'recommendation')
-    op.drop_column('stocks', 'change_percent')
-    op.drop_column('stocks', 'change')
-    op.drop_column('stocks', 'volume')
-    op.drop_column('stocks', 'low_price')
-    op.drop_column('stocks', 'high_price')
-    op.drop_column('stocks', 'open_price')
-
-
+    op.execute(
+        "ALTER TABLE stocks "
+        "DROP COLUMN recommendation, "
+        "DROP COLUMN change_percent, "
+        "DROP COLUMN change, "
+        "DROP COLUMN volume, "
+        "DROP COLUMN low_price, "
+        "DROP COLUMN high_price, "
+        "DROP COLUMN open_price"
+    )
@@ -28,14 +28,11 @@ def upgrade() -> None:
         sa.Column('snapshot_date', sa.DateTime(), nullable=False),
         sa.Column('total_value', sa.Float(), nullable=False),
         sa.Column('stock_count', sa.Integer(), nullable=False),
-        sa.Column('stock_prices', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+        sa.Column('stock_prices', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
         sa.Column('created_at', sa.DateTime(), nullable=True),
         sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_portfolio_snapshots_id'), 'portfolio_snapshots', ['id'], unique=False)
-    op.create_index(op.f('ix_portfolio_snapshots_portfolio_id'), 'portfolio_snapshots', ['portfolio_id'], unique=False)
-    op.create_index(op.f('ix_portfolio_snapshots_snapshot_date'), 'portfolio_snapshots', ['snapshot_date'], unique=False)
 
     # Create portfolio_history table
     op.create_table(
@@ -44,26 +41,26 @@ def upgrade() -> None:
         sa.Column('portfolio_id', sa.Integer(), nullable=False),
         sa.Column('action', sa.String(length=50), nullable=False),
         sa.Column('description', sa.Text(), nullable=False),
-        sa.Column('changes', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+        sa.Column('changes', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
         sa.Column('created_at', sa.DateTime(), nullable=True),
         sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ),
         sa.PrimaryKeyConstraint('id')
     )
-    op.create_index(op.f('ix_portfolio_history_id'), 'portfolio_history', ['id'], unique=False)
-    op.create_index(op.f('ix_portfolio_history_portfolio_id'), 'portfolio_history', ['portfolio_id'], unique=False)
-    op.create_index(op.f('ix_portfolio_history_created_at'), 'portfolio_history', ['created_at'], unique=False)
+
+    # Build indexes outside the DDL transaction so CONCURRENTLY is allowed
+    with op.get_context().autocommit_block():
+        op.create_index('ix_portfolio_snapshots_portfolio_date', 'portfolio_snapshots', ['portfolio_id', sa.text('snapshot_date DESC')], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_portfolio_history_portfolio_created', 'portfolio_history', ['portfolio_id', sa.text('created_at DESC')], unique=False, postgresql_concurrently=True)
 
 
 def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_portfolio_history_portfolio_created', table_name='portfolio_history', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_portfolio_snapshots_portfolio_date', table_name='portfolio_snapshots', postgresql_concurrently=True, if_exists=True)
+
     # Drop portfolio_history table
-    op.drop_index(op.f('ix_portfolio_history_created_at'), table_name='portfolio_history')
-    op.drop_index(op.f('ix_portfolio_history_portfolio_id'), table_name='portfolio_history')
-    op.drop_index(op.f('ix_portfolio_history_id'), table_name='portfolio_history')
     op.drop_table('portfolio_history')
 
     # Drop portfolio_snapshots table
-    op.drop_index(op.f('ix_portfolio_snapshots_snapshot_date'), table_name='portfolio_snapshots')
-    op.drop_index(op.f('ix_portfolio_snapshots_portfolio_id'), table_name='portfolio_snapshots')
-    op.drop_index(op.f('ix_portfolio_snapshots_id'), table_name='portfolio_snapshots')
     op.drop_table('portfolio_snapshots')
 
@@ -19,14 +19,12 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # Add undone column as nullable first
-    op.add_column('rebalancing_history', sa.Column('undone', sa.Boolean(), nullable=True))
-    
-    # Set default value for existing rows
-    op.execute('UPDATE rebalancing_history SET undone = false WHERE undone IS NULL')
-    
-    # Now make it NOT NULL
-    op.alter_column('rebalancing_history', 'undone', nullable=False)
+    # Add undone column as NOT NULL with a constant default; existing rows
+    # pick up the default from the catalog without rewriting the table
+    op.add_column(
+        'rebalancing_history',
+        sa.Column('undone', sa.Boolean(), nullable=False, server_default=sa.false())
+    )
     
     # Add undone_at column (remains nullable)
     op.add_column('rebalancing_history', sa.Column('undone_at', sa.DateTime(), nullable=True))
@@ -6,8 +6,6 @@ Create Date: 2025-10-12 14:00:00.000000
 
 """
 from alembic import op
-import sqlalchemy as sa
-from sqlalchemy.dialects import postgresql
 
 # revision identifiers, used by Alembic.
 revision = 'e4f5a6b7c8d9'
@@ -17,43 +15,44 @@ depends_on = None
 
 
 def upgrade() -> None:
-    # Make strategy_id nullable
-    op.alter_column('holdings', 'strategy_id',
-               existing_type=sa.INTEGER(),
-               nullable=True)
+    # Relax strategy_id, add the manual-holding columns and the portfolio FK
+    # in one ALTER TABLE so the exclusive lock is taken once. The FK is added
+    # NOT VALID so existing rows are not scanned while the lock is held; the
+    # constant is_manual default is stored in the catalog (no rewrite).
+    op.execute("""
+        ALTER TABLE holdings
+            ALTER COLUMN strategy_id DROP NOT NULL,
+            ADD COLUMN portfolio_id INTEGER,
+            ADD COLUMN purchase_date TIMESTAMP WITHOUT TIME ZONE,
+            ADD COLUMN notes TEXT,
+            ADD COLUMN is_manual BOOLEAN NOT NULL DEFAULT false,
+            ADD CONSTRAINT holdings_portfolio_id_fkey
+                FOREIGN KEY (portfolio_id) REFERENCES portfolios (id) NOT VALID
+    """)
     
-    # Add new columns
-    op.add_column('holdings', sa.Column('portfolio_id', sa.Integer(), nullable=True))
-    op.add_column('holdings', sa.Column('purchase_date', sa.DateTime(), nullable=True))
-    op.add_column('holdings', sa.Column('notes', sa.Text(), nullable=True))
-    op.add_column('holdings', sa.Column('is_manual', sa.Boolean(), nullable=False, server_default='false'))
-    
-    # Add foreign key constraint for portfolio_id
-    op.create_foreign_key('holdings_portfolio_id_fkey', 'holdings', 'portfolios', ['portfolio_id'], ['id'])
-    
-    # Create indexes for better query performance
-    op.create_index(op.f('ix_holdings_portfolio_id'), 'holdings', ['portfolio_id'], unique=False)
-    op.create_index(op.f('ix_holdings_is_manual'), 'holdings', ['is_manual'], unique=False)
-    op.create_index(op.f('ix_holdings_purchase_date'), 'holdings', ['purchase_date'], unique=False)
+    # Validate the FK and build indexes outside the DDL transaction; neither
+    # blocks writes to holdings. CONCURRENTLY cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.execute('ALTER TABLE holdings VALIDATE CONSTRAINT holdings_portfolio_id_fkey')
+        op.create_index(op.f('ix_holdings_portfolio_id'), 'holdings', ['portfolio_id'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_holdings_is_manual'), 'holdings', ['is_manual'], unique=False, postgresql_concurrently=True)
+        op.create_index(op.f('ix_holdings_purchase_date'), 'holdings', ['purchase_date'], unique=False, postgresql_concurrently=True)
 
 
 def downgrade() -> None:
     # Drop indexes
-    op.drop_index(op.f('ix_holdings_purchase_date'), table_name='holdings')
-    op.drop_index(op.f('ix_holdings_is_manual'), table_name='holdings')
-    op.drop_index(op.f('ix_holdings_portfolio_id'), table_name='holdings')
-    
-    # Drop foreign key
-    op.drop_constraint('holdings_portfolio_id_fkey', 'holdings', type_='foreignkey')
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_holdings_purchase_date'), table_name='holdings', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_holdings_is_manual'), table_name='holdings', postgresql_concurrently=True)
+        op.drop_index(op.f('ix_holdings_portfolio_id'), table_name='holdings', postgresql_concurrently=True)
     
-    # Drop columns
-    op.drop_column('holdings', 'is_manual')
-    op.drop_column('holdings', 'notes')
-    op.drop_column('holdings', 'purchase_date')
-    op.drop_column('holdings', 'portfolio_id')
-    
-    # Make strategy_id not nullable again
-    op.alter_column('holdings', 'strategy_id',
-               existing_type=sa.INTEGER(),
-               nullable=False)
-
+    # Drop foreign key and columns, and make strategy_id not nullable again
+    op.execute("""
+        ALTER TABLE holdings
+            DROP CONSTRAINT holdings_portfolio_id_fkey,
+            DROP COLUMN is_manual,
+            DROP COLUMN notes,
+            DROP COLUMN purchase_date,
+            DROP COLUMN portfolio_id,
+            ALTER COLUMN strategy_id SET NOT NULL
+    """)
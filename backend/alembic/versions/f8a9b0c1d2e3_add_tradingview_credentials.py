@@ -33,15 +33,9 @@ def upgrade() -> None:
         sa.PrimaryKeyConstraint('id'),
         sa.UniqueConstraint('user_id')
     )
-    
-    # Create indexes
-    op.create_index(op.f('ix_tradingview_credentials_id'), 'tradingview_credentials', ['id'], unique=False)
 
 
 def downgrade() -> None:
-    # Drop indexes
-    op.drop_index(op.f('ix_tradingview_credentials_id'), table_name='tradingview_credentials')
-    
     # Drop table
     op.drop_table('tradingview_credentials')
 
@@ -0,0 +1,34 @@
+"""add composite user/strategy index on holdings
+
+Revision ID: h7i8j9k0l1m2
+Revises: g5h6i7j8k9l0
+Create Date: 2025-10-16 09:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'h7i8j9k0l1m2'
+down_revision = 'g5h6i7j8k9l0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Covering index for the per-strategy holdings lookup so the value
+    # columns can be served without heap fetches
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_holdings_user_strategy',
+            'holdings',
+            ['user_id', 'strategy_id'],
+            unique=False,
+            postgresql_include=['stock_id', 'quantity', 'average_price', 'current_value'],
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_holdings_user_strategy', table_name='holdings', postgresql_concurrently=True)
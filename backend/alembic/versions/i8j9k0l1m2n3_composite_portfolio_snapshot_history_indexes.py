@@ -0,0 +1,52 @@
+"""replace single-column portfolio snapshot/history indexes with composites
+
+Revision ID: i8j9k0l1m2n3
+Revises: h7i8j9k0l1m2
+Create Date: 2025-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'i8j9k0l1m2n3'
+down_revision = 'h7i8j9k0l1m2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Databases created before c9d8e0f2a3b4 was updated still carry the
+    # single-column indexes; fresh ones already have the composites
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_portfolio_snapshots_portfolio_date',
+            'portfolio_snapshots',
+            ['portfolio_id', sa.text('snapshot_date DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_portfolio_history_portfolio_created',
+            'portfolio_history',
+            ['portfolio_id', sa.text('created_at DESC')],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.drop_index('ix_portfolio_snapshots_snapshot_date', table_name='portfolio_snapshots', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_portfolio_snapshots_portfolio_id', table_name='portfolio_snapshots', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_portfolio_history_created_at', table_name='portfolio_history', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_portfolio_history_portfolio_id', table_name='portfolio_history', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_portfolio_snapshots_portfolio_id', 'portfolio_snapshots', ['portfolio_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_portfolio_snapshots_snapshot_date', 'portfolio_snapshots', ['snapshot_date'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_portfolio_history_portfolio_id', 'portfolio_history', ['portfolio_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_portfolio_history_created_at', 'portfolio_history', ['created_at'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_portfolio_history_portfolio_created', table_name='portfolio_history', postgresql_concurrently=True)
+        op.drop_index('ix_portfolio_snapshots_portfolio_date', table_name='portfolio_snapshots', postgresql_concurrently=True)
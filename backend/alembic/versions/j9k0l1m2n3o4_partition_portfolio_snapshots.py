@@ -0,0 +1,158 @@
+"""partition portfolio_snapshots by month of snapshot_date
+
+Revision ID: j9k0l1m2n3o4
+Revises: i8j9k0l1m2n3
+Create Date: 2025-10-16 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'j9k0l1m2n3o4'
+down_revision = 'i8j9k0l1m2n3'
+branch_labels = None
+depends_on = None
+
+
+# Number of monthly partitions created ahead of the current month. The app
+# rolls them forward (PortfolioService.ensure_snapshot_partitions, see
+# s8t9u0v1w2x3); rows outside the covered range land in the default partition.
+MONTHS_AHEAD = 12
+
+
+def upgrade() -> None:
+    # Move the existing table aside, freeing up the index names
+    op.rename_table('portfolio_snapshots', 'portfolio_snapshots_unpartitioned')
+    op.execute(
+        'ALTER TABLE portfolio_snapshots_unpartitioned '
+        'RENAME CONSTRAINT portfolio_snapshots_pkey TO portfolio_snapshots_unpartitioned_pkey'
+    )
+    op.drop_constraint('portfolio_snapshots_portfolio_id_fkey', 'portfolio_snapshots_unpartitioned', type_='foreignkey')
+    op.drop_index('ix_portfolio_snapshots_id', table_name='portfolio_snapshots_unpartitioned', if_exists=True)
+    op.drop_index('ix_portfolio_snapshots_portfolio_date', table_name='portfolio_snapshots_unpartitioned')
+
+    # Partitioned parent; the partition key has to be part of the primary key.
+    # Reuse the existing id sequence so ids keep increasing across the move.
+    op.create_table(
+        'portfolio_snapshots',
+        sa.Column(
+            'id',
+            sa.Integer(),
+            autoincrement=False,
+            server_default=sa.text("nextval('portfolio_snapshots_id_seq'::regclass)"),
+            nullable=False
+        ),
+        sa.Column('portfolio_id', sa.Integer(), nullable=False),
+        sa.Column('snapshot_date', sa.DateTime(), nullable=False),
+        sa.Column('total_value', sa.Float(), nullable=False),
+        sa.Column('stock_count', sa.Integer(), nullable=False),
+        sa.Column('stock_prices', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], name='portfolio_snapshots_portfolio_id_fkey'),
+        sa.PrimaryKeyConstraint('id', 'snapshot_date'),
+        postgresql_partition_by='RANGE (snapshot_date)'
+    )
+    op.execute('ALTER SEQUENCE portfolio_snapshots_id_seq OWNED BY portfolio_snapshots.id')
+
+    # Indexes on the parent are created on every partition automatically
+    op.create_index('ix_portfolio_snapshots_portfolio_date', 'portfolio_snapshots', ['portfolio_id', sa.text('snapshot_date DESC')], unique=False)
+
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_portfolio_snapshot_partitions(start_date date, end_date date)
+        RETURNS void AS $$
+        DECLARE
+            month_start date := date_trunc('month', start_date)::date;
+        BEGIN
+            WHILE month_start < end_date LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF portfolio_snapshots FOR VALUES FROM (%L) TO (%L)',
+                    'portfolio_snapshots_' || to_char(month_start, 'YYYY_MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    # Monthly partitions from the oldest snapshot up to MONTHS_AHEAD in the future
+    op.execute(f"""
+        SELECT create_portfolio_snapshot_partitions(
+            LEAST(
+                COALESCE((SELECT min(snapshot_date) FROM portfolio_snapshots_unpartitioned), now()),
+                now()
+            )::date,
+            (date_trunc('month', now()) + interval '{MONTHS_AHEAD + 1} months')::date
+        )
+    """)
+    op.execute('CREATE TABLE portfolio_snapshots_default PARTITION OF portfolio_snapshots DEFAULT')
+
+    # Copy rows one month at a time so each statement only touches one partition
+    op.execute("""
+        DO $$
+        DECLARE
+            month_start date;
+        BEGIN
+            FOR month_start IN
+                SELECT DISTINCT date_trunc('month', snapshot_date)::date
+                FROM portfolio_snapshots_unpartitioned
+                ORDER BY 1
+            LOOP
+                INSERT INTO portfolio_snapshots
+                    (id, portfolio_id, snapshot_date, total_value, stock_count, stock_prices, created_at)
+                SELECT id, portfolio_id, snapshot_date, total_value, stock_count, stock_prices, created_at
+                FROM portfolio_snapshots_unpartitioned
+                WHERE snapshot_date >= month_start
+                  AND snapshot_date < month_start + interval '1 month';
+            END LOOP;
+        END $$
+    """)
+
+    op.drop_table('portfolio_snapshots_unpartitioned')
+
+
+def downgrade() -> None:
+    op.create_table(
+        'portfolio_snapshots_unpartitioned',
+        sa.Column(
+            'id',
+            sa.Integer(),
+            autoincrement=False,
+            server_default=sa.text("nextval('portfolio_snapshots_id_seq'::regclass)"),
+            nullable=False
+        ),
+        sa.Column('portfolio_id', sa.Integer(), nullable=False),
+        sa.Column('snapshot_date', sa.DateTime(), nullable=False),
+        sa.Column('total_value', sa.Float(), nullable=False),
+        sa.Column('stock_count', sa.Integer(), nullable=False),
+        sa.Column('stock_prices', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], name='portfolio_snapshots_unpartitioned_portfolio_id_fkey'),
+        sa.PrimaryKeyConstraint('id', name='portfolio_snapshots_unpartitioned_pkey')
+    )
+    op.execute("""
+        INSERT INTO portfolio_snapshots_unpartitioned
+            (id, portfolio_id, snapshot_date, total_value, stock_count, stock_prices, created_at)
+        SELECT id, portfolio_id, snapshot_date, total_value, stock_count, stock_prices, created_at
+        FROM portfolio_snapshots
+    """)
+    op.execute('ALTER SEQUENCE portfolio_snapshots_id_seq OWNED BY portfolio_snapshots_unpartitioned.id')
+
+    # Dropping the parent drops every partition with it
+    op.drop_table('portfolio_snapshots')
+    op.execute('DROP FUNCTION IF EXISTS create_portfolio_snapshot_partitions(date, date)')
+
+    op.rename_table('portfolio_snapshots_unpartitioned', 'portfolio_snapshots')
+    op.execute(
+        'ALTER TABLE portfolio_snapshots '
+        'RENAME CONSTRAINT portfolio_snapshots_unpartitioned_pkey TO portfolio_snapshots_pkey'
+    )
+    op.execute(
+        'ALTER TABLE portfolio_snapshots '
+        'RENAME CONSTRAINT portfolio_snapshots_unpartitioned_portfolio_id_fkey TO portfolio_snapshots_portfolio_id_fkey'
+    )
+    op.create_index('ix_portfolio_snapshots_portfolio_date', 'portfolio_snapshots', ['portfolio_id', sa.text('snapshot_date DESC')], unique=False)
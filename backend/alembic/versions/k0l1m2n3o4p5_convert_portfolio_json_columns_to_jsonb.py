@@ -0,0 +1,47 @@
+"""convert portfolio snapshot/history json columns to jsonb
+
+Revision ID: k0l1m2n3o4p5
+Revises: j9k0l1m2n3o4
+Create Date: 2025-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'k0l1m2n3o4p5'
+down_revision = 'j9k0l1m2n3o4'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = [
+    ('portfolio_snapshots', 'stock_prices'),
+    ('portfolio_history', 'changes'),
+]
+
+
+def _convert(table: str, column: str, from_type: str, to_type: str) -> None:
+    # Databases created after c9d8e0f2a3b4 switched to JSONB are already
+    # converted; skip the rewrite there
+    op.execute(f"""
+        DO $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_name = '{table}' AND column_name = '{column}' AND data_type = '{from_type}'
+            ) THEN
+                ALTER TABLE {table} ALTER COLUMN {column} TYPE {to_type} USING {column}::{to_type};
+            END IF;
+        END $$
+    """)
+
+
+def upgrade() -> None:
+    for table, column in COLUMNS:
+        _convert(table, column, 'json', 'jsonb')
+
+
+def downgrade() -> None:
+    for table, column in COLUMNS:
+        _convert(table, column, 'jsonb', 'json')
@@ -0,0 +1,41 @@
+"""add portfolio_current_value materialized view
+
+Revision ID: l1m2n3o4p5q6
+Revises: k0l1m2n3o4p5
+Create Date: 2025-10-16 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'l1m2n3o4p5q6'
+down_revision = 'k0l1m2n3o4p5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Market value of the holdings mapped to each portfolio, refreshed
+    # after stock prices are updated
+    op.execute("""
+        CREATE MATERIALIZED VIEW portfolio_current_value AS
+        SELECT
+            h.portfolio_id,
+            SUM(h.quantity * s.current_price) AS total_value,
+            COUNT(*) AS stock_count
+        FROM holdings h
+        JOIN stocks s ON s.id = h.stock_id
+        WHERE h.portfolio_id IS NOT NULL
+        GROUP BY h.portfolio_id
+    """)
+
+    # REFRESH ... CONCURRENTLY requires a unique index on the view
+    op.execute(
+        'CREATE UNIQUE INDEX ix_portfolio_current_value_portfolio_id '
+        'ON portfolio_current_value (portfolio_id)'
+    )
+
+
+def downgrade() -> None:
+    op.execute('DROP MATERIALIZED VIEW IF EXISTS portfolio_current_value')
@@ -0,0 +1,47 @@
+"""use numeric for snapshot totals and stock price columns
+
+Revision ID: m2n3o4p5q6r7
+Revises: l1m2n3o4p5q6
+Create Date: 2025-10-16 14:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'm2n3o4p5q6r7'
+down_revision = 'l1m2n3o4p5q6'
+branch_labels = None
+depends_on = None
+
+
+STOCK_COLUMNS = ['open_price', 'high_price', 'low_price', 'change', 'change_percent']
+
+
+def _alter_stock_columns(type_: str) -> None:
+    # One ALTER TABLE so stocks is rewritten and locked only once
+    op.execute(
+        "ALTER TABLE stocks "
+        + ", ".join(
+            f"ALTER COLUMN {column} TYPE {type_} USING {column}::{type_}"
+            for column in STOCK_COLUMNS
+        )
+    )
+
+
+def upgrade() -> None:
+    # Both tables are small (a few hundred EGX stocks; snapshots split by
+    # month), so an in-place type change is used rather than add/backfill/swap
+    op.execute(
+        "ALTER TABLE portfolio_snapshots "
+        "ALTER COLUMN total_value TYPE numeric(18, 4) USING total_value::numeric(18, 4)"
+    )
+    _alter_stock_columns('numeric(18, 4)')
+
+
+def downgrade() -> None:
+    _alter_stock_columns('double precision')
+    op.execute(
+        "ALTER TABLE portfolio_snapshots "
+        "ALTER COLUMN total_value TYPE double precision USING total_value::double precision"
+    )
@@ -0,0 +1,34 @@
+"""drop redundant id indexes duplicating primary keys
+
+Revision ID: n3o4p5q6r7s8
+Revises: m2n3o4p5q6r7
+Create Date: 2025-10-16 15:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'n3o4p5q6r7s8'
+down_revision = 'm2n3o4p5q6r7'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_portfolio_snapshots_id', 'portfolio_snapshots'),
+    ('ix_portfolio_history_id', 'portfolio_history'),
+    ('ix_tradingview_credentials_id', 'tradingview_credentials'),
+]
+
+
+def upgrade() -> None:
+    # The primary key index already covers lookups by id. The migrations
+    # that created these were updated, so fresh databases never have them.
+    for index_name, table_name in INDEXES:
+        op.drop_index(index_name, table_name=table_name, if_exists=True)
+
+
+def downgrade() -> None:
+    for index_name, table_name in INDEXES:
+        op.create_index(index_name, table_name, ['id'], unique=False)
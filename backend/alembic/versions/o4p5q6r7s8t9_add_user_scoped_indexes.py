@@ -0,0 +1,51 @@
+"""add user-scoped composite and partial indexes
+
+Revision ID: o4p5q6r7s8t9
+Revises: n3o4p5q6r7s8
+Create Date: 2025-10-16 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'o4p5q6r7s8t9'
+down_revision = 'n3o4p5q6r7s8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_holdings_user_portfolio',
+            'holdings',
+            ['user_id', 'portfolio_id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+        # Unmapped holdings are looked up per user with both links NULL
+        op.create_index(
+            'ix_holdings_unmapped',
+            'holdings',
+            ['user_id'],
+            unique=False,
+            postgresql_where=sa.text('strategy_id IS NULL AND portfolio_id IS NULL'),
+            postgresql_concurrently=True
+        )
+        # Ownership checks filter on (id, user_id)
+        op.create_index(
+            'ix_portfolios_user_id_id',
+            'portfolios',
+            ['user_id', 'id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_portfolios_user_id_id', table_name='portfolios', postgresql_concurrently=True)
+        op.drop_index('ix_holdings_unmapped', table_name='holdings', postgresql_concurrently=True)
+        op.drop_index('ix_holdings_user_portfolio', table_name='holdings', postgresql_concurrently=True)
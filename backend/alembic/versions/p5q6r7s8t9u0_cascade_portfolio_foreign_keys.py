@@ -0,0 +1,72 @@
+"""cascade portfolio deletes to snapshots, history and holdings
+
+Revision ID: p5q6r7s8t9u0
+Revises: o4p5q6r7s8t9
+Create Date: 2025-10-16 17:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'p5q6r7s8t9u0'
+down_revision = 'o4p5q6r7s8t9'
+branch_labels = None
+depends_on = None
+
+
+# (table, constraint, ON DELETE action)
+FOREIGN_KEYS = [
+    ('portfolio_history', 'portfolio_history_portfolio_id_fkey', 'CASCADE'),
+    ('holdings', 'holdings_portfolio_id_fkey', 'SET NULL'),
+]
+
+
+def upgrade() -> None:
+    # Let a single DELETE on portfolios clean up its dependants
+    for table_name, constraint_name, action in FOREIGN_KEYS:
+        op.execute(f"""
+            ALTER TABLE {table_name}
+                DROP CONSTRAINT {constraint_name},
+                ADD CONSTRAINT {constraint_name}
+                    FOREIGN KEY (portfolio_id) REFERENCES portfolios (id)
+                    ON DELETE {action} NOT VALID
+        """)
+
+    # NOT VALID is not supported on partitioned tables
+    op.execute("""
+        ALTER TABLE portfolio_snapshots
+            DROP CONSTRAINT portfolio_snapshots_portfolio_id_fkey,
+            ADD CONSTRAINT portfolio_snapshots_portfolio_id_fkey
+                FOREIGN KEY (portfolio_id) REFERENCES portfolios (id)
+                ON DELETE CASCADE
+    """)
+
+    # Validate after the swap has committed, so the full-table scans only
+    # take SHARE UPDATE EXCLUSIVE instead of the ALTER's exclusive lock
+    _validate_foreign_keys()
+
+
+def downgrade() -> None:
+    op.execute("""
+        ALTER TABLE portfolio_snapshots
+            DROP CONSTRAINT portfolio_snapshots_portfolio_id_fkey,
+            ADD CONSTRAINT portfolio_snapshots_portfolio_id_fkey
+                FOREIGN KEY (portfolio_id) REFERENCES portfolios (id)
+    """)
+
+    for table_name, constraint_name, _ in FOREIGN_KEYS:
+        op.execute(f"""
+            ALTER TABLE {table_name}
+                DROP CONSTRAINT {constraint_name},
+                ADD CONSTRAINT {constraint_name}
+                    FOREIGN KEY (portfolio_id) REFERENCES portfolios (id) NOT VALID
+        """)
+
+    _validate_foreign_keys()
+
+
+def _validate_foreign_keys() -> None:
+    with op.get_context().autocommit_block():
+        for table_name, constraint_name, _ in FOREIGN_KEYS:
+            op.execute(f'ALTER TABLE {table_name} VALIDATE CONSTRAINT {constraint_name}')
@@ -0,0 +1,47 @@
+"""add trigram indexes for stock symbol/name search
+
+Revision ID: q6r7s8t9u0v1
+Revises: p5q6r7s8t9u0
+Create Date: 2025-10-16 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'q6r7s8t9u0v1'
+down_revision = 'p5q6r7s8t9u0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Let the list search's ILIKE '%term%' use an index instead of a seq scan
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_stocks_symbol_trgm',
+            'stocks',
+            ['symbol'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'symbol': 'gin_trgm_ops'},
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'ix_stocks_name_trgm',
+            'stocks',
+            ['name'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'name': 'gin_trgm_ops'},
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    # pg_trgm is left installed; other objects may depend on it
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_stocks_name_trgm', table_name='stocks', postgresql_concurrently=True)
+        op.drop_index('ix_stocks_symbol_trgm', table_name='stocks', postgresql_concurrently=True)
@@ -0,0 +1,38 @@
+"""add composite (strategy_id, snapshot_date DESC) index to strategy_snapshots
+
+Revision ID: r7s8t9u0v1w2
+Revises: q6r7s8t9u0v1
+Create Date: 2025-10-16 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'r7s8t9u0v1w2'
+down_revision = 'q6r7s8t9u0v1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Serves "latest N snapshots for a strategy" without a sort; every price
+    # refresh adds a row per strategy, so the table grows steadily
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_strategy_snapshots_strategy_date',
+            'strategy_snapshots',
+            ['strategy_id', sa.text('snapshot_date DESC')],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_strategy_snapshots_strategy_date',
+            table_name='strategy_snapshots',
+            postgresql_concurrently=True
+        )
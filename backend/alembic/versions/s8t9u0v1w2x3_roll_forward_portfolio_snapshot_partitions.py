@@ -0,0 +1,79 @@
+"""make portfolio_snapshots partition creation safe to run repeatedly
+
+Revision ID: s8t9u0v1w2x3
+Revises: r7s8t9u0v1w2
+Create Date: 2025-10-16 20:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 's8t9u0v1w2x3'
+down_revision = 'r7s8t9u0v1w2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The app calls this on startup and on every price refresh to keep
+    # partitions ahead of the current month. Rows that already landed in the
+    # default partition for a missing month are moved into the new partition
+    # before it is attached; PostgreSQL refuses to attach a range that
+    # overlaps rows in the default partition. The advisory lock serialises
+    # concurrent callers.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_portfolio_snapshot_partitions(start_date date, end_date date)
+        RETURNS void AS $$
+        DECLARE
+            month_start date := date_trunc('month', start_date)::date;
+            month_end date;
+            partition_name text;
+        BEGIN
+            PERFORM pg_advisory_xact_lock(hashtext('portfolio_snapshots_partitions'));
+            WHILE month_start < end_date LOOP
+                month_end := (month_start + interval '1 month')::date;
+                partition_name := 'portfolio_snapshots_' || to_char(month_start, 'YYYY_MM');
+                IF to_regclass(partition_name) IS NULL THEN
+                    EXECUTE format(
+                        'CREATE TABLE %I (LIKE portfolio_snapshots INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+                        partition_name
+                    );
+                    EXECUTE format(
+                        'WITH moved AS (DELETE FROM portfolio_snapshots_default '
+                        'WHERE snapshot_date >= %L AND snapshot_date < %L RETURNING *) '
+                        'INSERT INTO %I SELECT * FROM moved',
+                        month_start, month_end, partition_name
+                    );
+                    EXECUTE format(
+                        'ALTER TABLE portfolio_snapshots ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                        partition_name, month_start, month_end
+                    );
+                END IF;
+                month_start := month_end;
+            END LOOP;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+
+def downgrade() -> None:
+    # Original definition from j9k0l1m2n3o4
+    op.execute("""
+        CREATE OR REPLACE FUNCTION create_portfolio_snapshot_partitions(start_date date, end_date date)
+        RETURNS void AS $$
+        DECLARE
+            month_start date := date_trunc('month', start_date)::date;
+        BEGIN
+            WHILE month_start < end_date LOOP
+                EXECUTE format(
+                    'CREATE TABLE IF NOT EXISTS %I PARTITION OF portfolio_snapshots FOR VALUES FROM (%L) TO (%L)',
+                    'portfolio_snapshots_' || to_char(month_start, 'YYYY_MM'),
+                    month_start,
+                    (month_start + interval '1 month')::date
+                );
+                month_start := (month_start + interval '1 month')::date;
+            END LOOP;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
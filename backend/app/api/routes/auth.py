@@ -1,15 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
+from sqlalchemy.dialects.postgresql import insert
 
 from app.core.database import get_db
 from app.core.security import (
     get_password_hash, 
-    verify_password, 
+    verify_and_update_password, 
     create_access_token,
     create_refresh_token,
     decode_refresh_token,
-    get_current_user_id
+    get_current_user
 )
 from app.core.config import settings
 from app.models.user import User
@@ -20,39 +22,69 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(user_data: UserRegister, db: AsyncSession = Depends(get_db)):
-    # Check if user already exists
-    result = await db.execute(select(User).where(User.email == user_data.email))
-    existing_user = result.scalar_one_or_none()
+    # Cheap existence check so known emails skip the password hashing cost
+    result = await db.execute(select(User.id).where(User.email == user_data.email))
     
-    if existing_user:
+    if result.scalar_one_or_none() is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    new_user = User(email=user_data.email, password_hash=hashed_password)
+    # Create new user; ON CONFLICT keeps concurrent registrations atomic
+    hashed_password = await run_in_threadpool(get_password_hash, user_data.password)
+    stmt = (
+        insert(User)
+        .values(email=user_data.email, password_hash=hashed_password)
+        .on_conflict_do_nothing(index_elements=[User.email])
+        .returning(User)
+    )
+    result = await db.execute(stmt)
+    new_user = result.scalar_one_or_none()
+    
+    if new_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     
-    db.add(new_user)
     await db.commit()
-    await db.refresh(new_user)
     
     return new_user
 
 
 @router.post("/login", response_model=Token)
 async def login(user_data: UserLogin, db: AsyncSession = Depends(get_db)):
-    # Find user
-    result = await db.execute(select(User).where(User.email == user_data.email))
-    user = result.scalar_one_or_none()
+    # Find user (only the columns needed to authenticate)
+    result = await db.execute(
+        select(User.id, User.password_hash).where(User.email == user_data.email)
+    )
+    user = result.one_or_none()
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password"
+        )
     
-    if not user or not verify_password(user_data.password, user.password_hash):
+    # Password hashing is CPU-bound; keep it off the event loop
+    verified, new_hash = await run_in_threadpool(
+        verify_and_update_password, user_data.password, user.password_hash
+    )
+    
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
         )
     
+    # Transparently migrate legacy bcrypt hashes to argon2id
+    if new_hash:
+        await db.execute(
+            update(User).where(User.id == user.id).values(password_hash=new_hash)
+        )
+        await db.commit()
+    
     # Create access token and refresh token
     access_token = create_access_token(data={"sub": str(user.id)})
     refresh_token = create_refresh_token(data={"sub": str(user.id)})
@@ -87,10 +119,9 @@ async def refresh_token(
     # Verify user still exists
     try:
         user_id = int(user_id_str)
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
+        result = await db.execute(select(User.id).where(User.id == user_id))
         
-        if not user:
+        if result.scalar_one_or_none() is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found"
@@ -102,7 +133,7 @@ async def refresh_token(
         )
     
     # Create new access token
-    new_access_token = create_access_token(data={"sub": str(user.id)})
+    new_access_token = create_access_token(data={"sub": str(user_id)})
     
     return {
         "access_token": new_access_token,
@@ -113,18 +144,5 @@ async def refresh_token(
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(
-    user_id: int = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db)
-):
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
-        )
-    
+async def read_current_user(user: User = Depends(get_current_user)):
     return user
-
@@ -1,13 +1,16 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.orm import selectinload, raiseload
 from datetime import datetime
 from typing import Optional
+import asyncio
 import csv
 import io
+import orjson
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal
 from app.core.security import get_current_user_id
 from app.models.holding import Holding
 from app.models.stock import Stock
@@ -18,174 +21,211 @@ from app.schemas.holding import (
     ManualHoldingCreate,
     HoldingUpdate,
     HoldingMap,
-    CSVHoldingImport
+    CSVHoldingImport,
+    PortfolioHoldingsValue
 )
 from app.services.import_export_service import import_export_service
+from app.services.stock_service import stock_service
+from app.services.portfolio_service import portfolio_service
+from app.services.holding_write_batcher import holding_write_batcher
 
 router = APIRouter(prefix="/holdings", tags=["holdings"])
 
+_HOLDINGS_BATCH_SIZE = 200
+
+# Only the stock columns that HoldingWithStock actually exposes
+_holding_stock_loader = selectinload(Holding.stock).load_only(
+    Stock.symbol,
+    Stock.name,
+    Stock.logo_url,
+    Stock.current_price,
+    Stock.sector
+)
+
+# Strategy/portfolio names for single-holding responses
+_holding_name_loaders = (
+    selectinload(Holding.strategy).load_only(Strategy.name),
+    selectinload(Holding.portfolio).load_only(Portfolio.name)
+)
 
-async def _get_strategy_name(db: AsyncSession, strategy_id: Optional[int]) -> Optional[str]:
-    """Helper function to get strategy name"""
-    if not strategy_id:
-        return None
-    result = await db.execute(select(Strategy).where(Strategy.id == strategy_id))
-    strategy = result.scalar_one_or_none()
-    return strategy.name if strategy else None
+
+def _with_names(stmt):
+    """Outer-join the strategy and portfolio names onto a Holding select"""
+    return (
+        stmt
+        .outerjoin(Strategy, Holding.strategy_id == Strategy.id)
+        .outerjoin(Portfolio, Holding.portfolio_id == Portfolio.id)
+    )
 
 
-async def _get_portfolio_name(db: AsyncSession, portfolio_id: Optional[int]) -> Optional[str]:
-    """Helper function to get portfolio name"""
-    if not portfolio_id:
+async def _get_owned_name(model, entity_id: Optional[int], user_id: int) -> Optional[str]:
+    """Name of a user's strategy/portfolio, looked up on its own session so checks can run concurrently"""
+    if not entity_id:
         return None
-    result = await db.execute(select(Portfolio).where(Portfolio.id == portfolio_id))
-    portfolio = result.scalar_one_or_none()
-    return portfolio.name if portfolio else None
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(model.name).where(model.id == entity_id, model.user_id == user_id)
+        )
+        return result.scalar_one_or_none()
+
+
+def _to_schema(holding, stock, strategy_name: Optional[str], portfolio_name: Optional[str]) -> HoldingWithStock:
+    """Build a HoldingWithStock response from a holding and its stock columns"""
+    return HoldingWithStock.model_construct(
+        id=holding.id,
+        user_id=holding.user_id,
+        strategy_id=holding.strategy_id,
+        portfolio_id=holding.portfolio_id,
+        stock_id=holding.stock_id,
+        quantity=holding.quantity,
+        average_price=holding.average_price,
+        current_value=holding.current_value,
+        purchase_date=holding.purchase_date,
+        notes=holding.notes,
+        is_manual=holding.is_manual,
+        stock_symbol=stock.symbol,
+        stock_name=stock.name,
+        stock_logo_url=stock.logo_url,
+        current_stock_price=stock.current_price,
+        stock_sector=stock.sector,
+        strategy_name=strategy_name,
+        portfolio_name=portfolio_name
+    )
+
+
+# Exactly the HoldingWithStock fields, as plain columns
+_holding_with_stock_columns = (
+    Holding.id,
+    Holding.user_id,
+    Holding.strategy_id,
+    Holding.portfolio_id,
+    Holding.stock_id,
+    Holding.quantity,
+    Holding.average_price,
+    Holding.current_value,
+    Holding.purchase_date,
+    Holding.notes,
+    Holding.is_manual,
+    Stock.symbol.label("stock_symbol"),
+    Stock.name.label("stock_name"),
+    Stock.logo_url.label("stock_logo_url"),
+    Stock.current_price.label("current_stock_price"),
+    Stock.sector.label("stock_sector"),
+    Strategy.name.label("strategy_name"),
+    Portfolio.name.label("portfolio_name")
+)
+
+
+# The streamed routes bypass response_model; document their body instead
+_STREAMED_HOLDINGS_RESPONSES = {
+    status.HTTP_200_OK: {"model": list[HoldingWithStock]}
+}
+
+
+def _stream_holdings(*criteria) -> StreamingResponse:
+    """Stream holdings matching criteria as a JSON array, encoding each row as the cursor yields it"""
+    async def generate():
+        # The request's session is closed before a streamed body is sent,
+        # so the generator owns its session
+        async with AsyncSessionLocal() as session:
+            # Column rows rather than ORM entities: no identity map or
+            # attribute instrumentation on the hot path
+            result = await session.stream(
+                _with_names(
+                    select(*_holding_with_stock_columns)
+                    .join(Stock, Holding.stock_id == Stock.id)
+                )
+                .where(*criteria)
+                .execution_options(yield_per=_HOLDINGS_BATCH_SIZE)
+            )
+            
+            yield b"["
+            first = True
+            async for row in result:
+                if not first:
+                    yield b","
+                first = False
+                yield orjson.dumps(row._asdict())
+            yield b"]"
+    
+    return StreamingResponse(generate(), media_type="application/json")
 
 
-@router.get("", response_model=list[HoldingWithStock])
+@router.get(
+    "",
+    response_class=StreamingResponse,
+    responses=_STREAMED_HOLDINGS_RESPONSES
+)
 async def list_holdings(
-    db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    result = await db.execute(
-        select(Holding, Stock)
-        .join(Stock, Holding.stock_id == Stock.id)
-        .where(Holding.user_id == user_id)
-    )
-    holdings_with_stocks = result.all()
-    
-    holdings_list = []
-    for holding, stock in holdings_with_stocks:
-        strategy_name = await _get_strategy_name(db, holding.strategy_id)
-        portfolio_name = await _get_portfolio_name(db, holding.portfolio_id)
-        
-        holdings_list.append(HoldingWithStock(
-            id=holding.id,
-            user_id=holding.user_id,
-            strategy_id=holding.strategy_id,
-            portfolio_id=holding.portfolio_id,
-            stock_id=holding.stock_id,
-            quantity=holding.quantity,
-            average_price=holding.average_price,
-            current_value=holding.current_value,
-            purchase_date=holding.purchase_date,
-            notes=holding.notes,
-            is_manual=holding.is_manual,
-            stock_symbol=stock.symbol,
-            stock_name=stock.name,
-            stock_logo_url=stock.logo_url,
-            current_stock_price=stock.current_price,
-            stock_sector=stock.sector,
-            strategy_name=strategy_name,
-            portfolio_name=portfolio_name
-        ))
-    
-    return holdings_list
+    return _stream_holdings(Holding.user_id == user_id)
 
 
-@router.get("/strategy/{strategy_id}", response_model=list[HoldingWithStock])
+@router.get(
+    "/strategy/{strategy_id}",
+    response_class=StreamingResponse,
+    responses=_STREAMED_HOLDINGS_RESPONSES
+)
 async def list_strategy_holdings(
     strategy_id: int,
+    user_id: int = Depends(get_current_user_id)
+):
+    return _stream_holdings(
+        Holding.user_id == user_id,
+        Holding.strategy_id == strategy_id
+    )
+
+
+@router.get(
+    "/portfolio-values",
+    response_model=list[PortfolioHoldingsValue],
+    response_class=ORJSONResponse
+)
+async def list_portfolio_holdings_values(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
+    """Get the market value of holdings per portfolio (as of the last price refresh)"""
     result = await db.execute(
-        select(Holding, Stock)
-        .join(Stock, Holding.stock_id == Stock.id)
-        .where(
-            Holding.user_id == user_id,
-            Holding.strategy_id == strategy_id
-        )
+        select(Portfolio.id).where(Portfolio.user_id == user_id)
     )
-    holdings_with_stocks = result.all()
+    portfolio_ids = list(result.scalars().all())
     
-    holdings_list = []
-    for holding, stock in holdings_with_stocks:
-        strategy_name = await _get_strategy_name(db, holding.strategy_id)
-        portfolio_name = await _get_portfolio_name(db, holding.portfolio_id)
-        
-        holdings_list.append(HoldingWithStock(
-            id=holding.id,
-            user_id=holding.user_id,
-            strategy_id=holding.strategy_id,
-            portfolio_id=holding.portfolio_id,
-            stock_id=holding.stock_id,
-            quantity=holding.quantity,
-            average_price=holding.average_price,
-            current_value=holding.current_value,
-            purchase_date=holding.purchase_date,
-            notes=holding.notes,
-            is_manual=holding.is_manual,
-            stock_symbol=stock.symbol,
-            stock_name=stock.name,
-            stock_logo_url=stock.logo_url,
-            current_stock_price=stock.current_price,
-            stock_sector=stock.sector,
-            strategy_name=strategy_name,
-            portfolio_name=portfolio_name
-        ))
-    
-    return holdings_list
+    # Plain dicts from the view; skip the response_model validation pass
+    return ORJSONResponse(await portfolio_service.get_current_values(db, portfolio_ids))
 
 
 # New endpoints for manual holdings
 
-@router.get("/unmapped", response_model=list[HoldingWithStock])
+@router.get(
+    "/unmapped",
+    response_class=StreamingResponse,
+    responses=_STREAMED_HOLDINGS_RESPONSES
+)
 async def list_unmapped_holdings(
-    db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """Get all holdings that are not mapped to any strategy or portfolio"""
-    result = await db.execute(
-        select(Holding, Stock)
-        .join(Stock, Holding.stock_id == Stock.id)
-        .where(
-            Holding.user_id == user_id,
-            Holding.strategy_id.is_(None),
-            Holding.portfolio_id.is_(None)
-        )
+    return _stream_holdings(
+        Holding.user_id == user_id,
+        Holding.strategy_id.is_(None),
+        Holding.portfolio_id.is_(None)
     )
-    holdings_with_stocks = result.all()
-    
-    holdings_list = []
-    for holding, stock in holdings_with_stocks:
-        holdings_list.append(HoldingWithStock(
-            id=holding.id,
-            user_id=holding.user_id,
-            strategy_id=holding.strategy_id,
-            portfolio_id=holding.portfolio_id,
-            stock_id=holding.stock_id,
-            quantity=holding.quantity,
-            average_price=holding.average_price,
-            current_value=holding.current_value,
-            purchase_date=holding.purchase_date,
-            notes=holding.notes,
-            is_manual=holding.is_manual,
-            stock_symbol=stock.symbol,
-            stock_name=stock.name,
-            stock_logo_url=stock.logo_url,
-            current_stock_price=stock.current_price,
-            stock_sector=stock.sector,
-            strategy_name=None,
-            portfolio_name=None
-        ))
-    
-    return holdings_list
 
 
 @router.post("/manual", response_model=HoldingWithStock, status_code=status.HTTP_201_CREATED)
 async def create_manual_holding(
     holding_data: ManualHoldingCreate,
-    db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """Create a manual holding without a strategy"""
-    # Verify stock exists
-    stock_result = await db.execute(
-        select(Stock).where(Stock.id == holding_data.stock_id)
-    )
-    stock = stock_result.scalar_one_or_none()
+    # Verify stock exists. Use a short-lived session so no connection is held
+    # while waiting for the batched insert.
+    async with AsyncSessionLocal() as db:
+        stock = await db.scalar(
+            select(Stock).where(Stock.id == holding_data.stock_id)
+        )
     
     if not stock:
         raise HTTPException(
@@ -193,44 +233,102 @@ async def create_manual_holding(
             detail=f"Stock with id {holding_data.stock_id} not found"
         )
     
-    # Create the holding
-    current_value = holding_data.quantity * stock.current_price
-    
-    new_holding = Holding(
-        user_id=user_id,
-        stock_id=holding_data.stock_id,
-        quantity=holding_data.quantity,
-        average_price=holding_data.average_price,
-        current_value=current_value,
-        purchase_date=holding_data.purchase_date or datetime.utcnow(),
-        notes=holding_data.notes,
-        is_manual=True
-    )
+    # Create the holding; concurrent creates are coalesced into one INSERT
+    values = {
+        "user_id": user_id,
+        "stock_id": holding_data.stock_id,
+        "quantity": holding_data.quantity,
+        "average_price": holding_data.average_price,
+        "current_value": holding_data.quantity * stock.current_price,
+        "purchase_date": holding_data.purchase_date or datetime.utcnow(),
+        "notes": holding_data.notes,
+        "is_manual": True
+    }
+    holding_id = await holding_write_batcher.insert(values)
+    
+    return _to_schema(Holding(id=holding_id, **values), stock, None, None)
+
+
+@router.post("/import")
+async def import_holdings(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """Import manual holdings from CSV file"""
+    if not file.filename.endswith('.csv'):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Only CSV files are supported"
+        )
     
-    db.add(new_holding)
-    await db.commit()
-    await db.refresh(new_holding)
+    try:
+        holdings_data = [
+            CSVHoldingImport(**row)
+            for row in await import_export_service.parse_holdings_csv(file.file)
+        ]
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to parse CSV file: {str(e)}"
+        )
     
-    return HoldingWithStock(
-        id=new_holding.id,
-        user_id=new_holding.user_id,
-        strategy_id=new_holding.strategy_id,
-        portfolio_id=new_holding.portfolio_id,
-        stock_id=new_holding.stock_id,
-        quantity=new_holding.quantity,
-        average_price=new_holding.average_price,
-        current_value=new_holding.current_value,
-        purchase_date=new_holding.purchase_date,
-        notes=new_holding.notes,
-        is_manual=new_holding.is_manual,
-        stock_symbol=stock.symbol,
-        stock_name=stock.name,
-        stock_logo_url=stock.logo_url,
-        current_stock_price=stock.current_price,
-        stock_sector=stock.sector,
-        strategy_name=None,
-        portfolio_name=None
+    # Resolve every referenced symbol in one query
+    symbols = {row.stock_symbol for row in holdings_data}
+    stocks_result = await db.execute(
+        select(Stock.symbol, Stock.id, Stock.current_price).where(Stock.symbol.in_(symbols))
     )
+    stocks = {symbol: (stock_id, price) for symbol, stock_id, price in stocks_result.all()}
+    
+    rows = []
+    errors = []
+    for row in holdings_data:
+        if row.stock_symbol not in stocks:
+            errors.append({
+                'stock_symbol': row.stock_symbol,
+                'error': "Stock not found"
+            })
+            continue
+        
+        purchase_date = datetime.utcnow()
+        if row.purchase_date:
+            try:
+                purchase_date = datetime.strptime(row.purchase_date, "%Y-%m-%d")
+            except ValueError:
+                errors.append({
+                    'stock_symbol': row.stock_symbol,
+                    'error': f"Invalid purchase date '{row.purchase_date}', expected YYYY-MM-DD"
+                })
+                continue
+        
+        stock_id, current_price = stocks[row.stock_symbol]
+        rows.append({
+            'user_id': user_id,
+            'stock_id': stock_id,
+            'quantity': row.quantity,
+            'average_price': row.purchase_price,
+            'current_value': row.quantity * current_price,
+            'purchase_date': purchase_date,
+            'notes': row.notes,
+            'is_manual': True
+        })
+    
+    # Executemany form: SQLAlchemy batches the rows into multi-row INSERTs
+    # that stay under the bind parameter limit; one commit for the whole file
+    created_ids = []
+    if rows:
+        result = await db.execute(
+            insert(Holding).returning(Holding.id, sort_by_parameter_order=True),
+            rows
+        )
+        created_ids = list(result.scalars().all())
+        await db.commit()
+    
+    return {
+        "message": f"Imported {len(created_ids)} holdings",
+        "created": len(created_ids),
+        "errors": errors
+    }
 
 
 @router.put("/{holding_id}", response_model=HoldingWithStock)
@@ -241,61 +339,51 @@ async def update_holding(
     user_id: int = Depends(get_current_user_id)
 ):
     """Update holding details"""
+    # Update fields if provided
+    values = {}
+    if holding_data.quantity is not None:
+        values["quantity"] = holding_data.quantity
+    if holding_data.average_price is not None:
+        values["average_price"] = holding_data.average_price
+    if holding_data.purchase_date is not None:
+        values["purchase_date"] = holding_data.purchase_date
+    if holding_data.notes is not None:
+        values["notes"] = holding_data.notes
+    
+    # Recalculate current value in the database (UPDATE ... FROM stocks) and
+    # return everything the response needs in the same round trip
+    quantity = values.get("quantity", Holding.quantity)
     result = await db.execute(
-        select(Holding).where(
+        update(Holding)
+        .where(
             Holding.id == holding_id,
-            Holding.user_id == user_id
+            Holding.user_id == user_id,
+            Holding.stock_id == Stock.id
+        )
+        .values(**values, current_value=quantity * Stock.current_price)
+        .returning(
+            Holding,
+            Stock.symbol,
+            Stock.name,
+            Stock.logo_url,
+            Stock.current_price,
+            Stock.sector,
+            select(Strategy.name).where(Strategy.id == Holding.strategy_id).scalar_subquery().label("strategy_name"),
+            select(Portfolio.name).where(Portfolio.id == Holding.portfolio_id).scalar_subquery().label("portfolio_name")
         )
     )
-    holding = result.scalar_one_or_none()
+    row = result.one_or_none()
     
-    if not holding:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Holding not found"
         )
     
-    # Update fields if provided
-    if holding_data.quantity is not None:
-        holding.quantity = holding_data.quantity
-    if holding_data.average_price is not None:
-        holding.average_price = holding_data.average_price
-    if holding_data.purchase_date is not None:
-        holding.purchase_date = holding_data.purchase_date
-    if holding_data.notes is not None:
-        holding.notes = holding_data.notes
-    
-    # Recalculate current value
-    stock_result = await db.execute(select(Stock).where(Stock.id == holding.stock_id))
-    stock = stock_result.scalar_one()
-    holding.current_value = holding.quantity * stock.current_price
-    
     await db.commit()
-    await db.refresh(holding)
-    
-    strategy_name = await _get_strategy_name(db, holding.strategy_id)
-    portfolio_name = await _get_portfolio_name(db, holding.portfolio_id)
     
-    return HoldingWithStock(
-        id=holding.id,
-        user_id=holding.user_id,
-        strategy_id=holding.strategy_id,
-        portfolio_id=holding.portfolio_id,
-        stock_id=holding.stock_id,
-        quantity=holding.quantity,
-        average_price=holding.average_price,
-        current_value=holding.current_value,
-        purchase_date=holding.purchase_date,
-        notes=holding.notes,
-        is_manual=holding.is_manual,
-        stock_symbol=stock.symbol,
-        stock_name=stock.name,
-        stock_logo_url=stock.logo_url,
-        current_stock_price=stock.current_price,
-        stock_sector=stock.sector,
-        strategy_name=strategy_name,
-        portfolio_name=portfolio_name
-    )
+    # Stock columns are returned under their own names, so the row stands in for the stock
+    return _to_schema(row.Holding, row, row.strategy_name, row.portfolio_name)
 
 
 @router.put("/{holding_id}/map", response_model=HoldingWithStock)
@@ -306,11 +394,18 @@ async def map_holding(
     user_id: int = Depends(get_current_user_id)
 ):
     """Map a holding to a strategy or portfolio"""
-    result = await db.execute(
-        select(Holding).where(
-            Holding.id == holding_id,
-            Holding.user_id == user_id
-        )
+    # Load the holding and verify the targets concurrently
+    result, strategy_name, portfolio_name = await asyncio.gather(
+        db.execute(
+            select(Holding)
+            .options(_holding_stock_loader, *_holding_name_loaders, raiseload("*"))
+            .where(
+                Holding.id == holding_id,
+                Holding.user_id == user_id
+            )
+        ),
+        _get_owned_name(Strategy, map_data.strategy_id, user_id),
+        _get_owned_name(Portfolio, map_data.portfolio_id, user_id)
     )
     holding = result.scalar_one_or_none()
     
@@ -320,65 +415,29 @@ async def map_holding(
             detail="Holding not found"
         )
     
-    # Verify strategy or portfolio exists if provided
     if map_data.strategy_id:
-        strategy_result = await db.execute(
-            select(Strategy).where(
-                Strategy.id == map_data.strategy_id,
-                Strategy.user_id == user_id
-            )
-        )
-        if not strategy_result.scalar_one_or_none():
+        if strategy_name is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Strategy not found"
             )
         holding.strategy_id = map_data.strategy_id
+    elif holding.strategy:
+        strategy_name = holding.strategy.name
     
     if map_data.portfolio_id:
-        portfolio_result = await db.execute(
-            select(Portfolio).where(
-                Portfolio.id == map_data.portfolio_id,
-                Portfolio.user_id == user_id
-            )
-        )
-        if not portfolio_result.scalar_one_or_none():
+        if portfolio_name is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Portfolio not found"
             )
         holding.portfolio_id = map_data.portfolio_id
+    elif holding.portfolio:
+        portfolio_name = holding.portfolio.name
     
     await db.commit()
-    await db.refresh(holding)
-    
-    # Get stock info
-    stock_result = await db.execute(select(Stock).where(Stock.id == holding.stock_id))
-    stock = stock_result.scalar_one()
     
-    strategy_name = await _get_strategy_name(db, holding.strategy_id)
-    portfolio_name = await _get_portfolio_name(db, holding.portfolio_id)
-    
-    return HoldingWithStock(
-        id=holding.id,
-        user_id=holding.user_id,
-        strategy_id=holding.strategy_id,
-        portfolio_id=holding.portfolio_id,
-        stock_id=holding.stock_id,
-        quantity=holding.quantity,
-        average_price=holding.average_price,
-        current_value=holding.current_value,
-        purchase_date=holding.purchase_date,
-        notes=holding.notes,
-        is_manual=holding.is_manual,
-        stock_symbol=stock.symbol,
-        stock_name=stock.name,
-        stock_logo_url=stock.logo_url,
-        current_stock_price=stock.current_price,
-        stock_sector=stock.sector,
-        strategy_name=strategy_name,
-        portfolio_name=portfolio_name
-    )
+    return _to_schema(holding, holding.stock, strategy_name, portfolio_name)
 
 
 @router.delete("/{holding_id}", status_code=status.HTTP_204_NO_CONTENT)
@@ -389,21 +448,21 @@ async def delete_holding(
 ):
     """Delete a manual holding"""
     result = await db.execute(
-        select(Holding).where(
+        delete(Holding)
+        .where(
             Holding.id == holding_id,
             Holding.user_id == user_id,
             Holding.is_manual == True
         )
+        .returning(Holding.id)
     )
-    holding = result.scalar_one_or_none()
     
-    if not holding:
+    if result.first() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Manual holding not found"
         )
     
-    await db.delete(holding)
     await db.commit()
     
     return None
@@ -419,7 +478,9 @@ async def export_all_holdings(
     """Export all holdings with complete information to Excel"""
     # Get all holdings
     result = await db.execute(
-        select(Holding).where(Holding.user_id == user_id)
+        select(Holding)
+        .options(raiseload("*"))
+        .where(Holding.user_id == user_id)
     )
     holdings = result.scalars().all()
     
@@ -431,34 +492,28 @@ async def export_all_holdings(
     
     # Get all relevant stocks
     stock_ids = [h.stock_id for h in holdings]
-    stocks = {}
-    if stock_ids:
-        stocks_result = await db.execute(
-            select(Stock).where(Stock.id.in_(stock_ids))
-        )
-        stocks = {stock.id: stock for stock in stocks_result.scalars().all()}
+    stocks = await stock_service.get_stocks_by_ids(db, stock_ids)
     
-    # Get all strategies
-    strategy_ids = [h.strategy_id for h in holdings if h.strategy_id]
-    strategies = {}
+    # Preload strategy/portfolio names once per distinct id
+    strategy_ids = {h.strategy_id for h in holdings if h.strategy_id}
+    strategy_names = {}
     if strategy_ids:
         strategies_result = await db.execute(
-            select(Strategy).where(Strategy.id.in_(strategy_ids))
+            select(Strategy.id, Strategy.name).where(Strategy.id.in_(strategy_ids))
         )
-        strategies = {s.id: s for s in strategies_result.scalars().all()}
+        strategy_names = dict(strategies_result.all())
     
-    # Get all portfolios
-    portfolio_ids = [h.portfolio_id for h in holdings if h.portfolio_id]
-    portfolios = {}
+    portfolio_ids = {h.portfolio_id for h in holdings if h.portfolio_id}
+    portfolio_names = {}
     if portfolio_ids:
         portfolios_result = await db.execute(
-            select(Portfolio).where(Portfolio.id.in_(portfolio_ids))
+            select(Portfolio.id, Portfolio.name).where(Portfolio.id.in_(portfolio_ids))
         )
-        portfolios = {p.id: p for p in portfolios_result.scalars().all()}
+        portfolio_names = dict(portfolios_result.all())
     
     # Generate Excel
     excel_file = await import_export_service.create_holdings_excel(
-        db, holdings, stocks, strategies, portfolios
+        db, holdings, stocks, strategy_names, portfolio_names
     )
     
     return StreamingResponse(
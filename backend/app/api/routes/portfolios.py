@@ -1,13 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, delete, exists, func
+from sqlalchemy.orm import raiseload, joinedload
 from typing import List
+from itertools import groupby
+from operator import attrgetter
+import asyncio
+import orjson
 
-from app.core.database import get_db
+from app.core.database import get_db, AsyncSessionLocal, in_own_session
 from app.core.security import get_current_user_id
 from app.models.portfolio import Portfolio
 from app.models.stock import Stock
+from app.models.portfolio_history import PortfolioHistory
 from app.schemas.portfolio import (
     PortfolioCreate, 
     PortfolioUpdate, 
@@ -23,17 +29,114 @@ from app.services.import_export_service import import_export_service
 
 router = APIRouter(prefix="/portfolios", tags=["portfolios"])
 
+# The import template is static, so build it once
+_PORTFOLIO_TEMPLATE = import_export_service.generate_portfolio_template().getvalue()
+
+# Sessions a comparison export opens at once; well below the pool size so
+# one request with many ids can't starve the others
+_COMPARISON_CONCURRENCY = 4
+
+
+async def _get_owned_portfolio(db: AsyncSession, portfolio_id: int, user_id: int, *options) -> Portfolio:
+    """Primary-key load of a portfolio, 404 unless it belongs to the user"""
+    portfolio = await db.get(Portfolio, portfolio_id, options=options)
+    
+    if not portfolio or portfolio.user_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+    
+    return portfolio
+
+
+async def get_owned_portfolio(
+    portfolio_id: int,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> Portfolio:
+    """Dependency: the requested portfolio, or 404 unless it belongs to the user"""
+    return await _get_owned_portfolio(db, portfolio_id, user_id)
+
+
+async def get_owned_portfolio_with_stocks(
+    portfolio_id: int,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> Portfolio:
+    """Same as get_owned_portfolio, with its stocks joined into the same query"""
+    return await _get_owned_portfolio(db, portfolio_id, user_id, joinedload(Portfolio.stocks))
+
+
+async def get_owned_portfolio_id(
+    portfolio_id: int,
+    db: AsyncSession = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+) -> int:
+    """Dependency: the portfolio id after an EXISTS ownership check, for routes that don't need the row"""
+    owned = await db.scalar(
+        select(exists().where(
+            Portfolio.id == portfolio_id,
+            Portfolio.user_id == user_id
+        ))
+    )
+    
+    if not owned:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Portfolio not found"
+        )
+    
+    return portfolio_id
+
+
+# Rows fetched per round trip when streaming portfolios
+_PORTFOLIOS_BATCH_SIZE = 200
+
+# Exactly the PortfolioResponse fields
+_portfolio_response_columns = (
+    Portfolio.id,
+    Portfolio.user_id,
+    Portfolio.name,
+    Portfolio.stock_ids,
+    Portfolio.created_at
+)
+
 
 @router.get("", response_model=list[PortfolioResponse])
 async def list_portfolios(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
+    # Read-only list: plain rows, no ORM objects to hydrate
     result = await db.execute(
-        select(Portfolio).where(Portfolio.user_id == user_id)
+        select(*_portfolio_response_columns)
+        .where(Portfolio.user_id == user_id)
+        # Matches ix_portfolios_user_id_id, so no separate sort is needed
+        .order_by(Portfolio.id)
     )
-    portfolios = result.scalars().all()
-    return portfolios
+    return result.mappings().all()
+
+
+@router.get("/stream")
+async def stream_portfolios(
+    user_id: int = Depends(get_current_user_id)
+):
+    """Stream user portfolios as NDJSON, one portfolio per line"""
+    async def generate():
+        # The request's session is closed before a streamed body is sent,
+        # so the generator owns its session
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                select(*_portfolio_response_columns)
+                .where(Portfolio.user_id == user_id)
+                .order_by(Portfolio.id)
+                .execution_options(yield_per=_PORTFOLIOS_BATCH_SIZE)
+            )
+            async for row in result.mappings():
+                yield orjson.dumps(dict(row)) + b"\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 
 @router.post("", response_model=PortfolioResponse, status_code=status.HTTP_201_CREATED)
@@ -42,15 +145,17 @@ async def create_portfolio(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    new_portfolio = Portfolio(
-        user_id=user_id,
-        name=portfolio_data.name,
-        stock_ids=portfolio_data.stock_ids
+    result = await db.execute(
+        insert(Portfolio)
+        .values(
+            user_id=user_id,
+            name=portfolio_data.name,
+            stock_ids=portfolio_data.stock_ids
+        )
+        .returning(Portfolio)
     )
-    
-    db.add(new_portfolio)
+    new_portfolio = result.scalar_one()
     await db.commit()
-    await db.refresh(new_portfolio)
     
     # Create initial snapshot
     await portfolio_service.create_snapshot(db, new_portfolio.id)
@@ -71,100 +176,81 @@ async def create_portfolio(
 
 
 @router.get("/{portfolio_id}", response_model=PortfolioResponse)
-async def get_portfolio(
-    portfolio_id: int,
-    db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id)
-):
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id,
-            Portfolio.user_id == user_id
-        )
-    )
-    portfolio = result.scalar_one_or_none()
-    
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-    
+async def get_portfolio(portfolio: Portfolio = Depends(get_owned_portfolio)):
     return portfolio
 
 
 @router.put("/{portfolio_id}", response_model=PortfolioResponse)
 async def update_portfolio(
-    portfolio_id: int,
     portfolio_data: PortfolioUpdate,
+    portfolio: Portfolio = Depends(get_owned_portfolio),
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id,
-            Portfolio.user_id == user_id
-        )
-    )
-    portfolio = result.scalar_one_or_none()
-    
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-    
     # Store old values to detect changes
-    old_stock_ids = set(portfolio.stock_ids)
-    new_stock_ids = set(portfolio_data.stock_ids)
     old_name = portfolio.name
     
-    # Update portfolio
-    portfolio.name = portfolio_data.name
-    portfolio.stock_ids = portfolio_data.stock_ids
-    
-    await db.commit()
-    await db.refresh(portfolio)
-    
-    # Create snapshot if stocks changed
-    if old_stock_ids != new_stock_ids:
-        await portfolio_service.create_snapshot(db, portfolio_id)
-        
-        # Log stock changes
-        added = list(new_stock_ids - old_stock_ids)
-        removed = list(old_stock_ids - new_stock_ids)
-        
-        if added:
-            await portfolio_service.log_modification(
-                db,
-                portfolio_id,
-                action="added_stocks",
-                description=f"Added {len(added)} stock(s) to portfolio",
-                changes={"added": added}
-            )
-        
-        if removed:
-            await portfolio_service.log_modification(
-                db,
-                portfolio_id,
-                action="removed_stocks",
-                description=f"Removed {len(removed)} stock(s) from portfolio",
-                changes={"removed": removed}
-            )
-        
-        # Trigger rebalancing check
-        await rebalancing_service.handle_portfolio_change(
-            db, portfolio_id, user_id, old_stock_ids, new_stock_ids
-        )
+    name_changed = old_name != portfolio_data.name
+    stocks_changed = portfolio.stock_ids != portfolio_data.stock_ids
+    
+    # Nothing to write for an identical payload (e.g. a client retry)
+    if not name_changed and not stocks_changed:
+        return portfolio
+    
+    # Diff the stock lists only when they differ; a rename alone needs no sets.
+    # Lists are bounded by the exchange's listings, so plain set math is enough.
+    old_stock_ids = new_stock_ids = set()
+    added, removed = [], []
+    if stocks_changed:
+        old_stock_ids = set(portfolio.stock_ids)
+        new_stock_ids = set(portfolio_data.stock_ids)
+        added = [stock_id for stock_id in dict.fromkeys(portfolio_data.stock_ids) if stock_id not in old_stock_ids]
+        removed = [stock_id for stock_id in dict.fromkeys(portfolio.stock_ids) if stock_id not in new_stock_ids]
+        portfolio.stock_ids = portfolio_data.stock_ids
+    
+    if name_changed:
+        portfolio.name = portfolio_data.name
+    
+    # Collect history rows so they are written with the update in one commit
+    history_entries = []
+    
+    if added:
+        history_entries.append(PortfolioHistory(
+            portfolio_id=portfolio.id,
+            action="added_stocks",
+            description=f"Added {len(added)} stock(s) to portfolio",
+            changes={"added": added}
+        ))
+    
+    if removed:
+        history_entries.append(PortfolioHistory(
+            portfolio_id=portfolio.id,
+            action="removed_stocks",
+            description=f"Removed {len(removed)} stock(s) from portfolio",
+            changes={"removed": removed}
+        ))
     
     # Log name change
-    if old_name != portfolio_data.name:
-        await portfolio_service.log_modification(
-            db,
-            portfolio_id,
+    if name_changed:
+        history_entries.append(PortfolioHistory(
+            portfolio_id=portfolio.id,
             action="renamed",
             description=f"Portfolio renamed from '{old_name}' to '{portfolio_data.name}'",
             changes={"old_name": old_name, "new_name": portfolio_data.name}
+        ))
+    
+    db.add_all(history_entries)
+    await db.commit()
+    
+    # Snapshot and trigger rebalancing check if stocks changed; the two are
+    # independent so run them side by side on their own sessions
+    if added or removed:
+        await asyncio.gather(
+            in_own_session(portfolio_service.create_snapshot, portfolio.id),
+            in_own_session(
+                rebalancing_service.handle_portfolio_change,
+                portfolio.id, user_id, old_stock_ids, new_stock_ids
+            )
         )
     
     return portfolio
@@ -176,21 +262,22 @@ async def delete_portfolio(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
+    # Snapshots and history cascade, holdings are unlinked (ON DELETE rules)
     result = await db.execute(
-        select(Portfolio).where(
+        delete(Portfolio)
+        .where(
             Portfolio.id == portfolio_id,
             Portfolio.user_id == user_id
         )
+        .returning(Portfolio.id)
     )
-    portfolio = result.scalar_one_or_none()
     
-    if not portfolio:
+    if result.first() is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Portfolio not found"
         )
     
-    await db.delete(portfolio)
     await db.commit()
     
     return None
@@ -198,26 +285,10 @@ async def delete_portfolio(
 
 @router.get("/{portfolio_id}/performance", response_model=PortfolioPerformanceResponse)
 async def get_portfolio_performance(
-    portfolio_id: int,
-    db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id)
+    portfolio_id: int = Depends(get_owned_portfolio_id),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get portfolio performance metrics including time series data."""
-    # Verify portfolio ownership
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id,
-            Portfolio.user_id == user_id
-        )
-    )
-    portfolio = result.scalar_one_or_none()
-    
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-    
     try:
         performance = await portfolio_service.calculate_performance(db, portfolio_id)
         return performance
@@ -230,26 +301,10 @@ async def get_portfolio_performance(
 
 @router.get("/{portfolio_id}/sector-allocation", response_model=List[SectorAllocationResponse])
 async def get_portfolio_sector_allocation(
-    portfolio_id: int,
-    db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id)
+    portfolio_id: int = Depends(get_owned_portfolio_id),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get portfolio sector allocation with equal weight per stock."""
-    # Verify portfolio ownership
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id,
-            Portfolio.user_id == user_id
-        )
-    )
-    portfolio = result.scalar_one_or_none()
-    
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-    
     try:
         allocation = await portfolio_service.calculate_sector_allocation(db, portfolio_id)
         return allocation
@@ -262,52 +317,20 @@ async def get_portfolio_sector_allocation(
 
 @router.get("/{portfolio_id}/snapshots", response_model=List[PortfolioSnapshotResponse])
 async def get_portfolio_snapshots(
-    portfolio_id: int,
-    db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id)
+    portfolio_id: int = Depends(get_owned_portfolio_id),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get portfolio value snapshots over time."""
-    # Verify portfolio ownership
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id,
-            Portfolio.user_id == user_id
-        )
-    )
-    portfolio = result.scalar_one_or_none()
-    
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-    
     snapshots = await portfolio_service.get_snapshots(db, portfolio_id)
     return snapshots
 
 
 @router.get("/{portfolio_id}/history", response_model=List[PortfolioHistoryResponse])
 async def get_portfolio_history(
-    portfolio_id: int,
-    db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id)
+    portfolio_id: int = Depends(get_owned_portfolio_id),
+    db: AsyncSession = Depends(get_db)
 ):
     """Get portfolio modification history."""
-    # Verify portfolio ownership
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id,
-            Portfolio.user_id == user_id
-        )
-    )
-    portfolio = result.scalar_one_or_none()
-    
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-    
     history = await portfolio_service.get_history(db, portfolio_id)
     return history
 
@@ -317,12 +340,13 @@ async def get_portfolio_history(
 @router.get("/import-template")
 async def download_portfolio_template():
     """Download CSV template for portfolio import"""
-    template = import_export_service.generate_portfolio_template()
-    
-    return StreamingResponse(
-        template,
+    return Response(
+        _PORTFOLIO_TEMPLATE,
         media_type="text/csv",
-        headers={"Content-Disposition": "attachment; filename=portfolio_import_template.csv"}
+        headers={
+            "Content-Disposition": "attachment; filename=portfolio_import_template.csv",
+            "Cache-Control": "public, max-age=86400"
+        }
     )
 
 
@@ -340,59 +364,67 @@ async def import_portfolios(
         )
     
     try:
-        content = await file.read()
-        portfolios_data = await import_export_service.parse_portfolio_csv(content)
+        portfolios_data = await import_export_service.parse_portfolio_csv(file.file)
         
-        created_portfolios = []
+        # Resolve every symbol in the file with one query
+        all_symbols = {symbol for portfolio_data in portfolios_data for symbol in portfolio_data['symbols']}
+        result = await db.execute(
+            select(Stock.symbol, Stock.id).where(Stock.symbol.in_(all_symbols))
+        )
+        symbol_to_id = dict(result.all())
+        
+        new_portfolios = []
         errors = []
         
         for portfolio_data in portfolios_data:
-            try:
-                # Look up stocks by symbol
-                stock_symbols = portfolio_data['symbols']
-                result = await db.execute(
-                    select(Stock).where(Stock.symbol.in_(stock_symbols))
-                )
-                stocks = result.scalars().all()
-                stock_ids = [stock.id for stock in stocks]
-                
-                # Check for missing symbols
-                found_symbols = {stock.symbol for stock in stocks}
-                missing_symbols = set(stock_symbols) - found_symbols
-                if missing_symbols:
-                    errors.append({
-                        'portfolio': portfolio_data['name'],
-                        'error': f"Stocks not found: {', '.join(missing_symbols)}"
-                    })
-                    continue
-                
-                # Create portfolio
-                new_portfolio = Portfolio(
-                    user_id=user_id,
-                    name=portfolio_data['name'],
-                    stock_ids=stock_ids
-                )
-                db.add(new_portfolio)
-                await db.commit()
-                await db.refresh(new_portfolio)
-                
-                # Create snapshot and log
-                await portfolio_service.create_snapshot(db, new_portfolio.id)
-                await portfolio_service.log_modification(
-                    db,
-                    new_portfolio.id,
-                    action="created",
-                    description=f"Portfolio '{new_portfolio.name}' imported with {len(stock_ids)} stocks",
-                    changes={"added": stock_ids, "stock_count": len(stock_ids)}
-                )
-                
-                created_portfolios.append(new_portfolio)
-                
-            except Exception as e:
+            # Check for missing symbols
+            stock_symbols = portfolio_data['symbols']
+            missing_symbols = set(stock_symbols) - symbol_to_id.keys()
+            if missing_symbols:
                 errors.append({
                     'portfolio': portfolio_data['name'],
-                    'error': str(e)
+                    'error': f"Stocks not found: {', '.join(missing_symbols)}"
                 })
+                continue
+            
+            new_portfolios.append({
+                'user_id': user_id,
+                'name': portfolio_data['name'],
+                'stock_ids': list(dict.fromkeys(symbol_to_id[symbol] for symbol in stock_symbols))
+            })
+        
+        created_portfolios = []
+        if new_portfolios:
+            # One multi-row INSERT; RETURNING hands back the new ids
+            result = await db.execute(
+                insert(Portfolio).returning(
+                    Portfolio.id,
+                    Portfolio.name,
+                    Portfolio.stock_ids,
+                    sort_by_parameter_order=True
+                ),
+                new_portfolios
+            )
+            created_portfolios = result.all()
+            await db.commit()
+            
+            # Snapshots and history are independent bulk writes; run them side
+            # by side on their own sessions
+            await asyncio.gather(
+                in_own_session(
+                    portfolio_service.create_snapshots_bulk,
+                    [portfolio.id for portfolio in created_portfolios]
+                ),
+                in_own_session(portfolio_service.log_modifications_bulk, [
+                    {
+                        "portfolio_id": portfolio.id,
+                        "action": "created",
+                        "description": f"Portfolio '{portfolio.name}' imported with {len(portfolio.stock_ids)} stocks",
+                        "changes": {"added": portfolio.stock_ids, "stock_count": len(portfolio.stock_ids)}
+                    }
+                    for portfolio in created_portfolios
+                ])
+            )
         
         return {
             "message": f"Imported {len(created_portfolios)} portfolios",
@@ -409,41 +441,17 @@ async def import_portfolios(
 
 @router.get("/{portfolio_id}/export")
 async def export_portfolio(
-    portfolio_id: int,
-    db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id)
+    portfolio: Portfolio = Depends(get_owned_portfolio_with_stocks),
+    db: AsyncSession = Depends(get_db)
 ):
     """Export single portfolio to Excel"""
-    # Verify portfolio ownership
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id,
-            Portfolio.user_id == user_id
-        )
-    )
-    portfolio = result.scalar_one_or_none()
-    
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-    
-    # Get stocks
-    stocks = []
-    if portfolio.stock_ids:
-        stocks_result = await db.execute(
-            select(Stock).where(Stock.id.in_(portfolio.stock_ids))
-        )
-        stocks = stocks_result.scalars().all()
-    
     # Generate Excel
-    excel_file = await import_export_service.create_portfolio_excel(db, portfolio, stocks)
+    excel_file = await import_export_service.create_portfolio_excel(db, portfolio, portfolio.stocks)
     
     return StreamingResponse(
         excel_file,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=portfolio_{portfolio.name.replace(' ', '_')}.xlsx"}
+        headers={"Content-Disposition": portfolio.content_disposition("portfolio_{}.xlsx")}
     )
 
 
@@ -453,11 +461,31 @@ async def export_all_portfolios(
     user_id: int = Depends(get_current_user_id)
 ):
     """Export all user portfolios to Excel"""
-    # Get all portfolios
+    # Join each portfolio to its stocks in SQL, keeping the stock_ids order;
+    # the outer join keeps portfolios without stocks as a single NULL row
     result = await db.execute(
-        select(Portfolio).where(Portfolio.user_id == user_id)
+        select(
+            Portfolio.id.label("pid"),
+            Portfolio.name.label("portfolio_name"),
+            Portfolio.created_at.label("portfolio_created_at"),
+            Stock.symbol,
+            Stock.name,
+            Stock.sector,
+            Stock.current_price,
+            Stock.change_percent
+        )
+        .select_from(Portfolio)
+        .outerjoin(Stock, Stock.id == func.any(Portfolio.stock_ids))
+        .where(Portfolio.user_id == user_id)
+        .order_by(Portfolio.id, func.array_position(Portfolio.stock_ids, Stock.id))
     )
-    portfolios = result.scalars().all()
+    
+    # Rows arrive ordered by portfolio, so consecutive rows form one sheet
+    portfolios = []
+    for _, group in groupby(result, key=attrgetter("pid")):
+        rows = list(group)
+        stocks = [row for row in rows if row.symbol is not None]
+        portfolios.append((rows[0].portfolio_name, rows[0].portfolio_created_at, stocks))
     
     if not portfolios:
         raise HTTPException(
@@ -465,21 +493,8 @@ async def export_all_portfolios(
             detail="No portfolios found"
         )
     
-    # Get all stocks
-    all_stock_ids = []
-    for portfolio in portfolios:
-        all_stock_ids.extend(portfolio.stock_ids)
-    
-    # Only query stocks if there are any stock IDs
-    stocks = {}
-    if all_stock_ids:
-        stocks_result = await db.execute(
-            select(Stock).where(Stock.id.in_(all_stock_ids))
-        )
-        stocks = {stock.id: stock for stock in stocks_result.scalars().all()}
-    
     # Generate Excel
-    excel_file = await import_export_service.create_all_portfolios_excel(db, portfolios, stocks)
+    excel_file = await import_export_service.create_all_portfolios_excel(db, portfolios)
     
     return StreamingResponse(
         excel_file,
@@ -490,28 +505,12 @@ async def export_all_portfolios(
 
 @router.get("/{portfolio_id}/history/export")
 async def export_portfolio_history(
-    portfolio_id: int,
-    db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id)
+    portfolio: Portfolio = Depends(get_owned_portfolio),
+    db: AsyncSession = Depends(get_db)
 ):
     """Export portfolio history to Excel"""
-    # Verify portfolio ownership
-    result = await db.execute(
-        select(Portfolio).where(
-            Portfolio.id == portfolio_id,
-            Portfolio.user_id == user_id
-        )
-    )
-    portfolio = result.scalar_one_or_none()
-    
-    if not portfolio:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Portfolio not found"
-        )
-    
     # Get history
-    history = await portfolio_service.get_history(db, portfolio_id)
+    history = await portfolio_service.get_history(db, portfolio.id)
     
     # Generate Excel
     excel_file = await import_export_service.create_portfolio_history_excel(db, portfolio, history)
@@ -519,7 +518,7 @@ async def export_portfolio_history(
     return StreamingResponse(
         excel_file,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=portfolio_{portfolio.name.replace(' ', '_')}_history.xlsx"}
+        headers={"Content-Disposition": portfolio.content_disposition("portfolio_{}_history.xlsx")}
     )
 
 
@@ -538,42 +537,57 @@ async def export_portfolio_comparison(
             detail="Invalid portfolio IDs format"
         )
     
-    # Get portfolios and their performance
-    comparison_data = []
-    for portfolio_id in ids:
-        result = await db.execute(
-            select(Portfolio).where(
-                Portfolio.id == portfolio_id,
-                Portfolio.user_id == user_id
-            )
+    # Get all requested portfolios in one query, keeping the requested order
+    result = await db.execute(
+        select(Portfolio)
+        .options(raiseload("*"))
+        .where(
+            Portfolio.id.in_(ids),
+            Portfolio.user_id == user_id
         )
-        portfolio = result.scalar_one_or_none()
+    )
+    portfolios_by_id = {portfolio.id: portfolio for portfolio in result.scalars().all()}
+    portfolios = [portfolios_by_id[portfolio_id] for portfolio_id in dict.fromkeys(ids) if portfolio_id in portfolios_by_id]
+    
+    # Performance calculations are independent, so run them concurrently,
+    # a bounded number at a time
+    semaphore = asyncio.Semaphore(_COMPARISON_CONCURRENCY)
+    
+    async def performance_of(portfolio_id: int):
+        async with semaphore:
+            return await in_own_session(portfolio_service.calculate_performance, portfolio_id)
+    
+    performances = await asyncio.gather(
+        *[performance_of(portfolio.id) for portfolio in portfolios],
+        return_exceptions=True
+    )
+    
+    comparison_data = []
+    for portfolio, performance in zip(portfolios, performances):
+        if isinstance(performance, Exception):
+            # If performance calculation fails, add basic info
+            comparison_data.append({
+                'portfolio_id': portfolio.id,
+                'portfolio_name': portfolio.name,
+                'current_value': 0,
+                'initial_value': 0,
+                'change': 0,
+                'change_percent': 0,
+                'stock_count': len(portfolio.stock_ids),
+                'time_series': []
+            })
+            continue
         
-        if portfolio:
-            try:
-                performance = await portfolio_service.calculate_performance(db, portfolio_id)
-                comparison_data.append({
-                    'portfolio_id': portfolio_id,
-                    'portfolio_name': portfolio.name,
-                    'current_value': performance.current_value,
-                    'initial_value': performance.initial_value,
-                    'change': performance.change,
-                    'change_percent': performance.change_percent,
-                    'stock_count': performance.stock_count,
-                    'time_series': performance.time_series
-                })
-            except Exception:
-                # If performance calculation fails, add basic info
-                comparison_data.append({
-                    'portfolio_id': portfolio_id,
-                    'portfolio_name': portfolio.name,
-                    'current_value': 0,
-                    'initial_value': 0,
-                    'change': 0,
-                    'change_percent': 0,
-                    'stock_count': len(portfolio.stock_ids),
-                    'time_series': []
-                })
+        comparison_data.append({
+            'portfolio_id': portfolio.id,
+            'portfolio_name': portfolio.name,
+            'current_value': performance['current_value'],
+            'initial_value': performance['initial_value'],
+            'change': performance['change'],
+            'change_percent': performance['change_percent'],
+            'stock_count': performance['stock_count'],
+            'time_series': performance['time_series']
+        })
     
     if not comparison_data:
         raise HTTPException(
@@ -1,44 +1,139 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query as QueryParam
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query as QueryParam
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, case, delete, func, literal_column
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime
+from typing import NamedTuple
+import asyncio
+import hashlib
 import logging
+import re
+import time
+import orjson
 
-from app.core.database import get_db
+from app.core.database import get_db, in_own_session
 from app.core.security import get_current_user_id
 from app.models.stock import Stock
-from app.models.strategy import Strategy
 from app.models.holding import Holding
 from app.models.portfolio import Portfolio
-from app.schemas.stock import StockResponse, StockCreate, StockDetailResponse
+from app.schemas.stock import StockResponse, StockCreate, StockDetailResponse, StockListItem
 from app.services.tradingview_service import tradingview_service
 from app.services.strategy_service import strategy_service
 from app.services.portfolio_service import portfolio_service
 
-router = APIRouter(prefix="/stocks", tags=["stocks"])
+router = APIRouter(prefix="/stocks", tags=["stocks"], default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 
-@router.get("", response_model=list[StockResponse])
+# Encoded list_stocks pages and their ETags keyed by (skip, limit, search);
+# cleared whenever stocks are added, removed or repriced through this router
+STOCK_LIST_CACHE_TTL = 30.0
+STOCK_LIST_CACHE_SIZE = 256
+_stock_list_cache: dict[tuple, tuple[float, bytes, str]] = {}
+
+# Exactly the StockListItem fields
+_stock_list_columns = tuple(getattr(Stock, field) for field in StockListItem.model_fields)
+
+
+def _invalidate_stock_list() -> None:
+    """Forget every cached list_stocks page"""
+    _stock_list_cache.clear()
+
+
+def _etag(*parts) -> str:
+    """Strong ETag over the given parts"""
+    return '"%s"' % hashlib.md5(":".join(map(str, parts)).encode()).hexdigest()
+
+
+def _not_modified(request: Request, etag: str) -> Response | None:
+    """Empty 304 when the client's If-None-Match already has this ETag"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return None
+    
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+
+class _StockRef(NamedTuple):
+    symbol: str
+    name: str
+
+
+# stock_id -> (symbol, name) for the TradingView proxy routes, which need
+# nothing else; filled on first use and by sync, dropped on delete
+_stock_refs: dict[int, _StockRef] = {}
+
+
+async def get_stock_ref(
+    stock_id: int,
+    db: AsyncSession = Depends(get_db)
+) -> _StockRef:
+    """Symbol and name of a stock, from memory when possible; 404 if it doesn't exist"""
+    stock = _stock_refs.get(stock_id)
+    if stock is None:
+        result = await db.execute(
+            select(Stock.symbol, Stock.name).where(Stock.id == stock_id)
+        )
+        row = result.one_or_none()
+        
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Stock not found"
+            )
+        
+        stock = _stock_refs[stock_id] = _StockRef(row.symbol, row.name)
+    
+    return stock
+
+
+@router.get("", response_model=list[StockListItem])
 async def list_stocks(
+    request: Request,
     skip: int = 0,
     limit: int = 500,
     search: str | None = None,
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    query = select(Stock)
+    key = (skip, limit, search)
+    now = time.monotonic()
+    cached = _stock_list_cache.get(key)
+    if cached is not None and cached[0] > now:
+        _, content, etag = cached
+        return _not_modified(request, etag) or Response(
+            content=content, media_type="application/json", headers={"ETag": etag}
+        )
+    
+    query = select(*_stock_list_columns)
     
     if search:
+        # Match the text literally; a bare % or _ would match (and scan) every row.
+        # Plain ILIKE on the columns keeps the pg_trgm GIN indexes usable
+        pattern = "%" + re.sub(r"([\\%_])", r"\\\1", search) + "%"
         query = query.where(
-            Stock.symbol.ilike(f"%{search}%") | 
-            Stock.name.ilike(f"%{search}%")
+            Stock.symbol.ilike(pattern, escape="\\") | 
+            Stock.name.ilike(pattern, escape="\\")
         )
     
     query = query.offset(skip).limit(limit)
     result = await db.execute(query)
-    stocks = result.scalars().all()
     
-    return stocks
+    # Encode once and serve the bytes as-is; no response_model pass
+    content = orjson.dumps([dict(row) for row in result.mappings()])
+    etag = _etag(hashlib.md5(content).hexdigest())
+    
+    if len(_stock_list_cache) >= STOCK_LIST_CACHE_SIZE:
+        _stock_list_cache.pop(next(iter(_stock_list_cache)))
+    _stock_list_cache[key] = (now + STOCK_LIST_CACHE_TTL, content, etag)
+    
+    return _not_modified(request, etag) or Response(
+        content=content, media_type="application/json", headers={"ETag": etag}
+    )
 
 
 @router.get("/search", status_code=status.HTTP_200_OK)
@@ -69,6 +164,8 @@ async def search_stocks(
 @router.get("/{stock_id}", response_model=StockResponse)
 async def get_stock(
     stock_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
@@ -81,68 +178,72 @@ async def get_stock(
             detail="Stock not found"
         )
     
+    # Every write to a stock bumps last_updated
+    etag = _etag("stock", stock.id, stock.last_updated.isoformat())
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    
+    response.headers["ETag"] = etag
     return stock
 
 
+# Candles encoded per chunk when streaming history
+_HISTORY_CHUNK_SIZE = 1000
+
+
 @router.get("/{stock_id}/history", status_code=status.HTTP_200_OK)
 async def get_stock_history(
-    stock_id: int,
     interval: str = QueryParam(default="1D", description="Time interval (1D, 1W, 1M)"),
-    range: str = QueryParam(default="1M", description="Time range (1W, 1M, 3M, 6M, 1Y, ALL)"),
-    db: AsyncSession = Depends(get_db),
+    range_param: str = QueryParam(default="1M", alias="range", description="Time range (1W, 1M, 3M, 6M, 1Y, ALL)"),
+    stock: _StockRef = Depends(get_stock_ref),
     user_id: int = Depends(get_current_user_id)
 ):
     """Get historical price data for a stock"""
-    result = await db.execute(select(Stock).where(Stock.id == stock_id))
-    stock = result.scalar_one_or_none()
-    
-    if not stock:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Stock not found"
-        )
-    
     try:
         # Fetch historical data from TradingView service
-        history = await tradingview_service.get_stock_history(
+        history = await tradingview_service.cached(
+            tradingview_service.HISTORY_CACHE_TTL,
+            tradingview_service.get_stock_history,
             symbol=stock.symbol,
             interval=interval,
-            range_param=range
+            range_param=range_param
         )
-        
-        return {
-            "symbol": stock.symbol,
-            "interval": interval,
-            "range": range,
-            "data": history
-        }
     except Exception as e:
         logger.error(f"Error fetching history for stock {stock.symbol}: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to fetch historical data: {str(e)}"
         )
+    
+    async def generate():
+        yield (
+            b'{"symbol":' + orjson.dumps(stock.symbol)
+            + b',"interval":' + orjson.dumps(interval)
+            + b',"range":' + orjson.dumps(range_param)
+            + b',"data":['
+        )
+        # Encode candles a batch at a time rather than the whole range at once
+        for start in range(0, len(history), _HISTORY_CHUNK_SIZE):
+            if start:
+                yield b","
+            yield orjson.dumps(history[start:start + _HISTORY_CHUNK_SIZE])[1:-1]
+        yield b"]}"
+    
+    return StreamingResponse(generate(), media_type="application/json")
 
 
 @router.get("/{stock_id}/news", status_code=status.HTTP_200_OK)
 async def get_stock_news(
-    stock_id: int,
     limit: int = QueryParam(default=10, description="Maximum number of news items"),
-    db: AsyncSession = Depends(get_db),
+    stock: _StockRef = Depends(get_stock_ref),
     user_id: int = Depends(get_current_user_id)
 ):
     """Get news headlines for a stock"""
-    result = await db.execute(select(Stock).where(Stock.id == stock_id))
-    stock = result.scalar_one_or_none()
-    
-    if not stock:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Stock not found"
-        )
-    
     try:
-        news_data = await tradingview_service.get_stock_news(
+        news_data = await tradingview_service.cached(
+            tradingview_service.NEWS_CACHE_TTL,
+            tradingview_service.get_stock_news,
             symbol=stock.symbol,
             limit=limit
         )
@@ -159,41 +260,6 @@ async def get_stock_news(
         )
 
 
-@router.get("/{stock_id}/ideas", status_code=status.HTTP_200_OK)
-async def get_stock_ideas(
-    stock_id: int,
-    limit: int = QueryParam(default=5, description="Maximum number of ideas"),
-    db: AsyncSession = Depends(get_db),
-    user_id: int = Depends(get_current_user_id)
-):
-    """Get trading ideas for a stock"""
-    result = await db.execute(select(Stock).where(Stock.id == stock_id))
-    stock = result.scalar_one_or_none()
-    
-    if not stock:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Stock not found"
-        )
-    
-    try:
-        ideas_data = await tradingview_service.get_stock_ideas(
-            symbol=stock.symbol,
-            limit=limit
-        )
-        
-        return {
-            "symbol": stock.symbol,
-            "ideas": ideas_data
-        }
-    except Exception as e:
-        logger.error(f"Error fetching ideas for stock {stock.symbol}: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to fetch trading ideas: {str(e)}"
-        )
-
-
 @router.get("/calendar/earnings", status_code=status.HTTP_200_OK)
 async def get_earnings_calendar(
     symbol: str = QueryParam(default=None, description="Optional symbol to filter by"),
@@ -202,7 +268,11 @@ async def get_earnings_calendar(
 ):
     """Get earnings calendar events"""
     try:
-        earnings_data = await tradingview_service.get_earnings_calendar(symbol=symbol)
+        earnings_data = await tradingview_service.cached(
+            tradingview_service.CALENDAR_CACHE_TTL,
+            tradingview_service.get_earnings_calendar,
+            symbol=symbol
+        )
         
         return {
             "earnings": earnings_data
@@ -223,7 +293,11 @@ async def get_dividend_calendar(
 ):
     """Get dividend calendar events"""
     try:
-        dividends_data = await tradingview_service.get_dividend_calendar(symbol=symbol)
+        dividends_data = await tradingview_service.cached(
+            tradingview_service.CALENDAR_CACHE_TTL,
+            tradingview_service.get_dividend_calendar,
+            symbol=symbol
+        )
         
         return {
             "dividends": dividends_data
@@ -239,6 +313,8 @@ async def get_dividend_calendar(
 @router.get("/{stock_id}/details", response_model=StockDetailResponse)
 async def get_stock_details(
     stock_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
@@ -252,36 +328,26 @@ async def get_stock_details(
             detail="Stock not found"
         )
     
-    # Return stock details directly from database
-    return StockDetailResponse(
-        id=stock.id,
-        symbol=stock.symbol,
-        name=stock.name,
-        exchange=stock.exchange,
-        current_price=stock.current_price,
-        logo_url=stock.logo_url,
-        sector=stock.sector,
-        industry=stock.industry,
-        last_updated=stock.last_updated,
-        open_price=stock.open_price,
-        high_price=stock.high_price,
-        low_price=stock.low_price,
-        volume=stock.volume,
-        change=stock.change,
-        change_percent=stock.change_percent,
-        recommendation=stock.recommendation,
-        market_cap=stock.market_cap,
-        pe_ratio=stock.pe_ratio,
-        eps=stock.eps,
-        dividend_yield=stock.dividend_yield,
-        beta=stock.beta,
-        price_to_book=stock.price_to_book,
-        price_to_sales=stock.price_to_sales,
-        roe=stock.roe,
-        debt_to_equity=stock.debt_to_equity,
-        current_ratio=stock.current_ratio,
-        quick_ratio=stock.quick_ratio,
-    )
+    etag = _etag("details", stock.id, stock.last_updated.isoformat())
+    not_modified = _not_modified(request, etag)
+    if not_modified:
+        return not_modified
+    
+    response.headers["ETag"] = etag
+    # Return stock details directly from database; response_model reads the attributes
+    return stock
+
+
+# Avatar URLs from tradingview_service._generate_logo_url
+_FALLBACK_LOGO_PREFIX = "https://ui-avatars.com/"
+
+# Market data columns a sync always overwrites
+_SYNC_OVERWRITE_COLUMNS = (
+    "open_price", "high_price", "low_price", "volume", "change", "change_percent",
+    "recommendation", "market_cap", "pe_ratio", "eps", "dividend_yield", "beta",
+    "price_to_book", "price_to_sales", "roe", "debt_to_equity", "current_ratio",
+    "quick_ratio", "last_updated"
+)
 
 
 @router.post("/sync", status_code=status.HTTP_200_OK)
@@ -299,86 +365,83 @@ async def sync_all_stocks(
             detail="Failed to fetch stocks from TradingView"
         )
     
-    added_count = 0
-    updated_count = 0
-    
-    for tv_stock in tv_stocks:
-        symbol = tv_stock["symbol"]
-        
-        # Check if stock exists
-        result = await db.execute(select(Stock).where(Stock.symbol == symbol))
-        existing_stock = result.scalar_one_or_none()
-        
-        if existing_stock:
-            # Update existing stock
-            existing_stock.name = tv_stock["name"]
-            existing_stock.current_price = tv_stock.get("price", existing_stock.current_price)
-            # Update logo if provided
-            if tv_stock.get("logo"):
-                existing_stock.logo_url = tv_stock["logo"]
-            # Update sector and industry
-            if tv_stock.get("sector"):
-                existing_stock.sector = tv_stock["sector"]
-            if tv_stock.get("industry"):
-                existing_stock.industry = tv_stock["industry"]
-            # Update OHLC data
-            existing_stock.open_price = tv_stock.get("open")
-            existing_stock.high_price = tv_stock.get("high")
-            existing_stock.low_price = tv_stock.get("low")
-            existing_stock.volume = tv_stock.get("volume")
-            existing_stock.change = tv_stock.get("change")
-            existing_stock.change_percent = tv_stock.get("change_percent")
-            existing_stock.recommendation = tv_stock.get("recommendation")
-            existing_stock.market_cap = tv_stock.get("market_cap")
-            existing_stock.pe_ratio = tv_stock.get("pe_ratio")
-            existing_stock.eps = tv_stock.get("eps")
-            existing_stock.dividend_yield = tv_stock.get("dividend_yield")
-            existing_stock.beta = tv_stock.get("beta")
-            existing_stock.price_to_book = tv_stock.get("price_to_book")
-            existing_stock.price_to_sales = tv_stock.get("price_to_sales")
-            existing_stock.roe = tv_stock.get("roe")
-            existing_stock.debt_to_equity = tv_stock.get("debt_to_equity")
-            existing_stock.current_ratio = tv_stock.get("current_ratio")
-            existing_stock.quick_ratio = tv_stock.get("quick_ratio")
-            updated_count += 1
-        else:
-            # Add new stock
+    now = datetime.utcnow()
+    # One row per symbol; a repeated symbol would hit the same row twice in one upsert
+    rows = [
+        {
+            "symbol": tv_stock["symbol"],
+            "name": tv_stock["name"],
+            "exchange": tv_stock["exchange"],
+            "current_price": tv_stock.get("price", 100.0),
             # Use logo from fetch response, or generate avatar as fallback
-            logo_url = tv_stock.get("logo")
-            if not logo_url:
-                logo_url = tradingview_service._generate_logo_url(symbol)
-            
-            new_stock = Stock(
-                symbol=symbol,
-                name=tv_stock["name"],
-                exchange=tv_stock["exchange"],
-                current_price=tv_stock.get("price", 100.0),
-                logo_url=logo_url,
-                sector=tv_stock.get("sector"),
-                industry=tv_stock.get("industry"),
-                open_price=tv_stock.get("open"),
-                high_price=tv_stock.get("high"),
-                low_price=tv_stock.get("low"),
-                volume=tv_stock.get("volume"),
-                change=tv_stock.get("change"),
-                change_percent=tv_stock.get("change_percent"),
-                recommendation=tv_stock.get("recommendation"),
-                market_cap=tv_stock.get("market_cap"),
-                pe_ratio=tv_stock.get("pe_ratio"),
-                eps=tv_stock.get("eps"),
-                dividend_yield=tv_stock.get("dividend_yield"),
-                beta=tv_stock.get("beta"),
-                price_to_book=tv_stock.get("price_to_book"),
-                price_to_sales=tv_stock.get("price_to_sales"),
-                roe=tv_stock.get("roe"),
-                debt_to_equity=tv_stock.get("debt_to_equity"),
-                current_ratio=tv_stock.get("current_ratio"),
-                quick_ratio=tv_stock.get("quick_ratio")
-            )
-            db.add(new_stock)
-            added_count += 1
+            "logo_url": tv_stock.get("logo") or tradingview_service._generate_logo_url(tv_stock["symbol"]),
+            "sector": tv_stock.get("sector"),
+            "industry": tv_stock.get("industry"),
+            "open_price": tv_stock.get("open"),
+            "high_price": tv_stock.get("high"),
+            "low_price": tv_stock.get("low"),
+            "volume": tv_stock.get("volume"),
+            "change": tv_stock.get("change"),
+            "change_percent": tv_stock.get("change_percent"),
+            "recommendation": tv_stock.get("recommendation"),
+            "market_cap": tv_stock.get("market_cap"),
+            "pe_ratio": tv_stock.get("pe_ratio"),
+            "eps": tv_stock.get("eps"),
+            "dividend_yield": tv_stock.get("dividend_yield"),
+            "beta": tv_stock.get("beta"),
+            "price_to_book": tv_stock.get("price_to_book"),
+            "price_to_sales": tv_stock.get("price_to_sales"),
+            "roe": tv_stock.get("roe"),
+            "debt_to_equity": tv_stock.get("debt_to_equity"),
+            "current_ratio": tv_stock.get("current_ratio"),
+            "quick_ratio": tv_stock.get("quick_ratio"),
+            "last_updated": now
+        }
+        for tv_stock in {tv_stock["symbol"]: tv_stock for tv_stock in tv_stocks}.values()
+    ]
+    
+    # Add new stocks and update existing ones in a single upsert
+    stmt = insert(Stock).values(rows)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Stock.symbol],
+        set_={
+            "name": excluded.name,
+            "current_price": excluded.current_price,
+            # Keep the stored logo unless TradingView returned a real one
+            "logo_url": case(
+                (excluded.logo_url.startswith(_FALLBACK_LOGO_PREFIX), Stock.logo_url),
+                else_=excluded.logo_url
+            ),
+            # Keep the stored sector and industry when TradingView has none
+            "sector": func.coalesce(func.nullif(excluded.sector, ""), Stock.sector),
+            "industry": func.coalesce(func.nullif(excluded.industry, ""), Stock.industry),
+            **{
+                column: excluded[column]
+                for column in _SYNC_OVERWRITE_COLUMNS
+            }
+        }
+    ).returning(
+        Stock.id,
+        Stock.symbol,
+        Stock.name,
+        literal_column("xmax = 0").label("inserted")
+    )
+    
+    result = await db.execute(stmt)
+    synced = result.all()
+    added_count = sum(row.inserted for row in synced)
+    updated_count = len(rows) - added_count
     
     await db.commit()
+    _invalidate_stock_list()
+    _stock_refs.update((row.id, _StockRef(row.symbol, row.name)) for row in synced)
+    
+    # Fresh market data; don't serve history or metrics from before the sync
+    tradingview_service.invalidate_cache(
+        tradingview_service.get_stock_history,
+        tradingview_service.get_stock_metrics
+    )
     
     return {
         "message": f"Stock sync completed",
@@ -388,6 +451,47 @@ async def sync_all_stocks(
     }
 
 
+async def _delete_unheld_stock(db: AsyncSession, condition):
+    """
+    Delete the stock matching condition unless holdings reference it, in one statement.
+    
+    Returns (id, symbol, name, holdings_count) of the matched stock, or None if
+    nothing matched; it was deleted iff holdings_count is 0.
+    """
+    target = (
+        select(
+            Stock.id,
+            Stock.symbol,
+            Stock.name,
+            select(func.count()).select_from(Holding)
+            .where(Holding.stock_id == Stock.id)
+            .scalar_subquery().label("holdings_count")
+        )
+        .where(condition)
+        .cte("target")
+    )
+    deleted = (
+        delete(Stock)
+        .where(Stock.id == target.c.id, target.c.holdings_count == 0)
+        .returning(Stock.id)
+        .cte("deleted")
+    )
+    # Referencing the DELETE's CTE keeps it in the statement
+    result = await db.execute(
+        select(target, select(deleted.c.id).scalar_subquery().label("deleted_id"))
+    )
+    row = result.one_or_none()
+    await db.commit()
+    
+    if row is None:
+        return None
+    
+    if row.deleted_id is not None:
+        _invalidate_stock_list()
+        _stock_refs.pop(row.id, None)
+    return row
+
+
 @router.delete("/{stock_id}", status_code=status.HTTP_200_OK)
 async def delete_stock(
     stock_id: int,
@@ -395,9 +499,7 @@ async def delete_stock(
     user_id: int = Depends(get_current_user_id)
 ):
     """Delete a stock from the database (admin function)"""
-    # Get the stock
-    result = await db.execute(select(Stock).where(Stock.id == stock_id))
-    stock = result.scalar_one_or_none()
+    stock = await _delete_unheld_stock(db, Stock.id == stock_id)
     
     if not stock:
         raise HTTPException(
@@ -405,22 +507,12 @@ async def delete_stock(
             detail="Stock not found"
         )
     
-    # Check if there are holdings associated with this stock
-    holdings_result = await db.execute(
-        select(Holding).where(Holding.stock_id == stock_id)
-    )
-    holdings = holdings_result.scalars().all()
-    
-    if holdings:
+    if stock.holdings_count:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot delete stock: {len(holdings)} holdings are associated with it"
+            detail=f"Cannot delete stock: {stock.holdings_count} holdings are associated with it"
         )
     
-    # Delete the stock
-    await db.delete(stock)
-    await db.commit()
-    
     return {
         "message": f"Stock {stock.symbol} deleted successfully",
         "symbol": stock.symbol,
@@ -435,9 +527,7 @@ async def delete_stock_by_symbol(
     user_id: int = Depends(get_current_user_id)
 ):
     """Delete a stock by symbol (admin function)"""
-    # Get the stock
-    result = await db.execute(select(Stock).where(Stock.symbol == symbol))
-    stock = result.scalar_one_or_none()
+    stock = await _delete_unheld_stock(db, Stock.symbol == symbol)
     
     if not stock:
         raise HTTPException(
@@ -445,22 +535,12 @@ async def delete_stock_by_symbol(
             detail=f"Stock with symbol {symbol} not found"
         )
     
-    # Check if there are holdings associated with this stock
-    holdings_result = await db.execute(
-        select(Holding).where(Holding.stock_id == stock.id)
-    )
-    holdings = holdings_result.scalars().all()
-    
-    if holdings:
+    if stock.holdings_count:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Cannot delete stock: {len(holdings)} holdings are associated with it. Please remove holdings first."
+            detail=f"Cannot delete stock: {stock.holdings_count} holdings are associated with it. Please remove holdings first."
         )
     
-    # Delete the stock
-    await db.delete(stock)
-    await db.commit()
-    
     return {
         "message": f"Stock {symbol} deleted successfully",
         "symbol": stock.symbol,
@@ -500,26 +580,41 @@ async def add_custom_stock(
     if not logo_url:
         logo_url = tradingview_service._generate_logo_url(stock_data["symbol"])
     
-    new_stock = Stock(
-        symbol=stock_data["symbol"],
-        name=stock_data["name"],
-        exchange=stock_data["exchange"],
-        current_price=stock_data.get("price", 0.0),
-        logo_url=logo_url,
-        sector=stock_data.get("sector"),
-        industry=stock_data.get("industry"),
-        open_price=stock_data.get("open"),
-        high_price=stock_data.get("high"),
-        low_price=stock_data.get("low"),
-        volume=stock_data.get("volume"),
-        change=stock_data.get("change"),
-        change_percent=stock_data.get("change_percent"),
-        recommendation=stock_data.get("recommendation")
+    # A concurrent request may have added the same symbol since the check above;
+    # ON CONFLICT leaves its row alone instead of failing on the unique index
+    result = await db.execute(
+        insert(Stock)
+        .values(
+            symbol=stock_data["symbol"],
+            name=stock_data["name"],
+            exchange=stock_data["exchange"],
+            current_price=stock_data.get("price", 0.0),
+            logo_url=logo_url,
+            sector=stock_data.get("sector"),
+            industry=stock_data.get("industry"),
+            open_price=stock_data.get("open"),
+            high_price=stock_data.get("high"),
+            low_price=stock_data.get("low"),
+            volume=stock_data.get("volume"),
+            change=stock_data.get("change"),
+            change_percent=stock_data.get("change_percent"),
+            recommendation=stock_data.get("recommendation")
+        )
+        .on_conflict_do_nothing(index_elements=[Stock.symbol])
+        .returning(Stock)
     )
-    
-    db.add(new_stock)
+    new_stock = result.scalar_one_or_none()
     await db.commit()
-    await db.refresh(new_stock)
+    
+    if new_stock is None:
+        result = await db.execute(select(Stock).where(Stock.symbol == stock_data["symbol"]))
+        return {
+            "message": f"Stock {symbol} already exists in database",
+            "stock": result.scalar_one(),
+            "created": False
+        }
+    
+    _invalidate_stock_list()
     
     return {
         "message": f"Stock {symbol} added successfully",
@@ -535,57 +630,44 @@ async def refresh_stock_prices(
 ):
     # Refresh stock prices from TradingView
     await tradingview_service.refresh_prices(db)
+    _invalidate_stock_list()
     
     # Update all holdings' current values based on new stock prices
-    holdings_result = await db.execute(
-        select(Holding, Stock)
-        .join(Stock, Holding.stock_id == Stock.id)
-    )
-    holdings_with_stocks = holdings_result.all()
-    
-    for holding, stock in holdings_with_stocks:
-        holding.current_value = holding.quantity * stock.current_price
-    
-    await db.commit()
-    
-    # Get all unique strategies that need snapshot updates
-    strategies_result = await db.execute(select(Strategy))
-    strategies = strategies_result.scalars().all()
+    await portfolio_service.recalculate_holding_values(db)
     
-    # Create new snapshots for all strategies
-    for strategy in strategies:
-        await strategy_service.create_snapshot(db, strategy.id)
+    # Long-running workers cross month boundaries; keep partitions ahead
+    await portfolio_service.ensure_snapshot_partitions(db)
     
     # Get all portfolios that need snapshot updates
-    portfolios_result = await db.execute(select(Portfolio))
-    portfolios = portfolios_result.scalars().all()
+    portfolio_ids = (await db.execute(select(Portfolio.id))).scalars().all()
+    
+    # Strategy snapshots are one INSERT ... SELECT; portfolio snapshots one
+    # multi-row INSERT; each runs on its own session alongside the other
+    await asyncio.gather(
+        in_own_session(strategy_service.create_snapshots_bulk),
+        in_own_session(portfolio_service.create_snapshots_bulk, portfolio_ids)
+    )
     
-    # Create new snapshots for all portfolios
-    for portfolio in portfolios:
-        await portfolio_service.create_snapshot(db, portfolio.id)
+    # Recompute per-portfolio holdings value from the new prices
+    await portfolio_service.refresh_current_values(db)
     
     return {"message": "Stock prices, holdings, and portfolio snapshots refreshed successfully"}
 
 
 @router.get("/{stock_id}/ideas", status_code=status.HTTP_200_OK)
 async def get_stock_ideas(
-    stock_id: int,
     limit: int = QueryParam(default=10, ge=1, le=50, description="Maximum number of ideas to return"),
-    db: AsyncSession = Depends(get_db),
+    stock: _StockRef = Depends(get_stock_ref),
     user_id: int = Depends(get_current_user_id)
 ):
     """Get trading ideas for a stock from TradingView"""
-    result = await db.execute(select(Stock).where(Stock.id == stock_id))
-    stock = result.scalar_one_or_none()
-    
-    if not stock:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Stock not found"
-        )
-    
     try:
-        ideas = await tradingview_service.get_stock_ideas(stock.symbol, limit=limit)
+        ideas = await tradingview_service.cached(
+            tradingview_service.SCRAPER_CACHE_TTL,
+            tradingview_service.get_stock_ideas,
+            symbol=stock.symbol,
+            limit=limit
+        )
         
         return {
             "symbol": stock.symbol,
@@ -603,24 +685,16 @@ async def get_stock_ideas(
 
 @router.get("/{stock_id}/indicators", status_code=status.HTTP_200_OK)
 async def get_stock_indicators(
-    stock_id: int,
     timeframe: str = QueryParam(default="1d", description="Timeframe (1d, 4h, 1h, etc.)"),
-    db: AsyncSession = Depends(get_db),
+    stock: _StockRef = Depends(get_stock_ref),
     user_id: int = Depends(get_current_user_id)
 ):
     """Get all technical indicators for a stock from TradingView"""
-    result = await db.execute(select(Stock).where(Stock.id == stock_id))
-    stock = result.scalar_one_or_none()
-    
-    if not stock:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Stock not found"
-        )
-    
     try:
-        indicators = await tradingview_service.get_technical_indicators(
-            stock.symbol,
+        indicators = await tradingview_service.cached(
+            tradingview_service.SCRAPER_CACHE_TTL,
+            tradingview_service.get_technical_indicators,
+            symbol=stock.symbol,
             timeframe=timeframe
         )
         
@@ -641,22 +715,16 @@ async def get_stock_indicators(
 
 @router.get("/{stock_id}/metrics", status_code=status.HTTP_200_OK)
 async def get_stock_metrics(
-    stock_id: int,
-    db: AsyncSession = Depends(get_db),
+    stock: _StockRef = Depends(get_stock_ref),
     user_id: int = Depends(get_current_user_id)
 ):
     """Get fundamental metrics for a stock from TradingView"""
-    result = await db.execute(select(Stock).where(Stock.id == stock_id))
-    stock = result.scalar_one_or_none()
-    
-    if not stock:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Stock not found"
-        )
-    
     try:
-        metrics = await tradingview_service.get_stock_metrics(stock.symbol)
+        metrics = await tradingview_service.cached(
+            tradingview_service.SCRAPER_CACHE_TTL,
+            tradingview_service.get_stock_metrics,
+            symbol=stock.symbol
+        )
         
         return {
             "symbol": stock.symbol,
@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import JSON, case, column, func, select, true
+from sqlalchemy.orm import raiseload
 
 from app.core.database import get_db
 from app.core.security import get_current_user_id
@@ -15,10 +16,38 @@ from app.schemas.strategy import StrategyCreate, StrategyUpdate, StrategyRespons
 from app.services.strategy_service import strategy_service
 from app.services.rebalancing_service import rebalancing_service
 from app.services.import_export_service import import_export_service
-from app.schemas.rebalancing import RebalancingCalculation, RebalancingHistoryResponse
+from app.services.stock_service import stock_service
+from app.schemas.rebalancing import RebalancingAction, RebalancingCalculation, RebalancingHistoryResponse
 
 router = APIRouter(prefix="/strategies", tags=["strategies"])
 
+# The import template is static, so build it once
+_STRATEGY_TEMPLATE = import_export_service.generate_strategy_template().getvalue()
+
+# Exactly the StrategySnapshotResponse / RebalancingHistoryResponse fields
+_snapshot_response_columns = tuple(
+    getattr(StrategySnapshot, field) for field in StrategySnapshotResponse.model_fields
+)
+_rebalancing_history_response_columns = tuple(
+    getattr(RebalancingHistory, field) for field in RebalancingHistoryResponse.model_fields
+)
+
+
+async def _require_strategy(db: AsyncSession, strategy_id: int, user_id: int) -> None:
+    """404 unless the user owns the strategy; a primary-key lookup of the id only"""
+    result = await db.execute(
+        select(Strategy.id).where(
+            Strategy.id == strategy_id,
+            Strategy.user_id == user_id
+        )
+    )
+    
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Strategy not found"
+        )
+
 
 @router.get("", response_model=list[StrategyResponse])
 async def list_strategies(
@@ -26,7 +55,9 @@ async def list_strategies(
     user_id: int = Depends(get_current_user_id)
 ):
     result = await db.execute(
-        select(Strategy).where(Strategy.user_id == user_id)
+        select(Strategy)
+        .options(raiseload("*"))
+        .where(Strategy.user_id == user_id)
     )
     strategies = result.scalars().all()
     return strategies
@@ -172,69 +203,56 @@ async def get_pending_rebalancing(
     user_id: int = Depends(get_current_user_id)
 ):
     """Get the latest pending (not executed) rebalancing actions for a strategy"""
-    # Verify strategy ownership
-    result = await db.execute(
-        select(Strategy).where(
-            Strategy.id == strategy_id,
-            Strategy.user_id == user_id
-        )
-    )
-    strategy = result.scalar_one_or_none()
-    
-    if not strategy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Strategy not found"
-        )
-    
-    # Get the latest pending rebalancing record
-    history_result = await db.execute(
-        select(RebalancingHistory)
+    # Unnest the latest pending record's actions and join each to its stock
+    # symbol in one query; ordinality keeps the saved order. Ownership is part
+    # of the same query
+    latest = (
+        select(RebalancingHistory.actions)
+        .join(Strategy, Strategy.id == RebalancingHistory.strategy_id)
         .where(
-            RebalancingHistory.strategy_id == strategy_id,
+            Strategy.id == strategy_id,
+            Strategy.user_id == user_id,
             RebalancingHistory.executed == False
         )
         .order_by(RebalancingHistory.created_at.desc())
         .limit(1)
+        .subquery("latest")
+    )
+    # A record saved without actions holds {} rather than a list
+    saved_actions = case(
+        (func.json_typeof(latest.c.actions) == "array", latest.c.actions),
+        else_=func.json_build_array()
+    )
+    saved = (
+        func.json_array_elements(saved_actions)
+        .table_valued(column("action", JSON), with_ordinality="position")
+        .render_derived()
+        .lateral("saved")
+    )
+    action_stock_id = saved.c.action["stock_id"].as_integer()
+    actions_result = await db.execute(
+        select(
+            saved.c.action["action"].as_string().label("action"),
+            action_stock_id.label("stock_id"),
+            func.coalesce(Stock.symbol, "").label("stock_symbol"),
+            saved.c.action["quantity"].as_integer().label("quantity"),
+            saved.c.action["price"].as_float().label("price")
+        )
+        .select_from(latest)
+        .join(saved, true())
+        .outerjoin(Stock, Stock.id == action_stock_id)
+        .order_by(saved.c.position)
     )
-    history = history_result.scalar_one_or_none()
-    
-    if not history or not history.actions:
-        # No pending actions - return empty
-        return RebalancingCalculation(
-            strategy_id=strategy_id,
-            current_value=0,
-            target_value=0,
-            actions=[]
-        )
     
-    # Convert saved actions to RebalancingAction objects
-    from app.schemas.rebalancing import RebalancingAction
+    # No pending record (or no actions) gives no rows and an empty result
     actions = [
-        RebalancingAction(
-            action=action["action"],
-            stock_id=action["stock_id"],
-            stock_symbol="",  # Will need to fetch
-            quantity=action["quantity"],
-            price=action["price"],
-            total_amount=action["quantity"] * action["price"]
-        )
-        for action in history.actions
+        RebalancingAction(**row, total_amount=row["quantity"] * row["price"])
+        for row in actions_result.mappings()
     ]
     
-    # Fetch stock symbols
-    stock_ids = [action["stock_id"] for action in history.actions]
-    stocks = {}
-    if stock_ids:
-        stocks_result = await db.execute(
-            select(Stock).where(Stock.id.in_(stock_ids))
-        )
-        stocks = {stock.id: stock for stock in stocks_result.scalars().all()}
-    
-    # Update stock symbols
-    for action in actions:
-        if action.stock_id in stocks:
-            action.stock_symbol = stocks[action.stock_id].symbol
+    # No rows may also mean the strategy isn't the user's
+    if not actions:
+        await _require_strategy(db, strategy_id, user_id)
     
     return RebalancingCalculation(
         strategy_id=strategy_id,
@@ -250,19 +268,7 @@ async def calculate_rebalancing(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    result = await db.execute(
-        select(Strategy).where(
-            Strategy.id == strategy_id,
-            Strategy.user_id == user_id
-        )
-    )
-    strategy = result.scalar_one_or_none()
-    
-    if not strategy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Strategy not found"
-        )
+    await _require_strategy(db, strategy_id, user_id)
     
     rebalancing_calculation = await rebalancing_service.calculate_rebalancing(db, strategy_id)
     return rebalancing_calculation
@@ -274,19 +280,7 @@ async def execute_rebalancing(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    result = await db.execute(
-        select(Strategy).where(
-            Strategy.id == strategy_id,
-            Strategy.user_id == user_id
-        )
-    )
-    strategy = result.scalar_one_or_none()
-    
-    if not strategy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Strategy not found"
-        )
+    await _require_strategy(db, strategy_id, user_id)
     
     await rebalancing_service.execute_rebalancing(db, strategy_id)
     return {"message": "Rebalancing executed successfully"}
@@ -300,31 +294,20 @@ async def undo_rebalancing(
     user_id: int = Depends(get_current_user_id)
 ):
     """Undo an executed rebalancing action"""
-    # Verify strategy ownership
-    result = await db.execute(
-        select(Strategy).where(
-            Strategy.id == strategy_id,
-            Strategy.user_id == user_id
-        )
-    )
-    strategy = result.scalar_one_or_none()
-    
-    if not strategy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Strategy not found"
-        )
-    
-    # Verify rebalancing record belongs to this strategy
+    # Verify the record belongs to this strategy and the strategy to this user
     rebalancing_result = await db.execute(
-        select(RebalancingHistory).where(
+        select(RebalancingHistory.id)
+        .join(Strategy, Strategy.id == RebalancingHistory.strategy_id)
+        .where(
             RebalancingHistory.id == rebalancing_id,
-            RebalancingHistory.strategy_id == strategy_id
+            Strategy.id == strategy_id,
+            Strategy.user_id == user_id
         )
     )
-    rebalancing = rebalancing_result.scalar_one_or_none()
     
-    if not rebalancing:
+    if rebalancing_result.scalar_one_or_none() is None:
+        # Report a missing strategy before a missing record
+        await _require_strategy(db, strategy_id, user_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Rebalancing record not found"
@@ -346,29 +329,22 @@ async def get_strategy_snapshots(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    # Verify strategy ownership
-    result = await db.execute(
-        select(Strategy).where(
+    # Get snapshots as plain rows, checking ownership in the same query
+    snapshots_result = await db.execute(
+        select(*_snapshot_response_columns)
+        .join(Strategy, Strategy.id == StrategySnapshot.strategy_id)
+        .where(
             Strategy.id == strategy_id,
             Strategy.user_id == user_id
         )
-    )
-    strategy = result.scalar_one_or_none()
-    
-    if not strategy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Strategy not found"
-        )
-    
-    # Get snapshots
-    snapshots_result = await db.execute(
-        select(StrategySnapshot)
-        .where(StrategySnapshot.strategy_id == strategy_id)
         .order_by(StrategySnapshot.snapshot_date.desc())
         .limit(30)  # Last 30 snapshots
     )
-    snapshots = snapshots_result.scalars().all()
+    snapshots = snapshots_result.mappings().all()
+    
+    # No rows may also mean the strategy isn't the user's
+    if not snapshots:
+        await _require_strategy(db, strategy_id, user_id)
     
     return snapshots
 
@@ -379,32 +355,24 @@ async def get_rebalancing_history(
     db: AsyncSession = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    # Verify strategy ownership
-    result = await db.execute(
-        select(Strategy).where(
-            Strategy.id == strategy_id,
-            Strategy.user_id == user_id
-        )
-    )
-    strategy = result.scalar_one_or_none()
-    
-    if not strategy:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Strategy not found"
-        )
-    
-    # Get rebalancing history (only executed ones)
+    # Get rebalancing history (only executed ones) as plain rows, checking
+    # ownership in the same query
     history_result = await db.execute(
-        select(RebalancingHistory)
+        select(*_rebalancing_history_response_columns)
+        .join(Strategy, Strategy.id == RebalancingHistory.strategy_id)
         .where(
-            RebalancingHistory.strategy_id == strategy_id,
+            Strategy.id == strategy_id,
+            Strategy.user_id == user_id,
             RebalancingHistory.executed == True
         )
         .order_by(RebalancingHistory.created_at.desc())
         .limit(50)  # Last 50 executed rebalancing actions
     )
-    history = history_result.scalars().all()
+    history = history_result.mappings().all()
+    
+    # No rows may also mean the strategy isn't the user's
+    if not history:
+        await _require_strategy(db, strategy_id, user_id)
     
     return history
 
@@ -414,12 +382,13 @@ async def get_rebalancing_history(
 @router.get("/import-template")
 async def download_strategy_template():
     """Download Excel template for strategy import"""
-    template = import_export_service.generate_strategy_template()
-    
-    return StreamingResponse(
-        template,
+    return Response(
+        _STRATEGY_TEMPLATE,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=strategy_import_template.xlsx"}
+        headers={
+            "Content-Disposition": "attachment; filename=strategy_import_template.xlsx",
+            "Cache-Control": "public, max-age=86400"
+        }
     )
 
 
@@ -438,8 +407,7 @@ async def import_strategy(
         )
     
     try:
-        content = await file.read()
-        parsed_data = await import_export_service.parse_strategy_excel(content, db)
+        parsed_data = await import_export_service.parse_strategy_excel(file.file, db)
         holdings_data = parsed_data.get('holdings', [])
         
         if not holdings_data:
@@ -529,16 +497,14 @@ async def export_strategy(
     holdings = holdings_result.scalars().all()
     
     # Get all relevant stocks
-    stock_ids = [h.stock_id for h in holdings]
-    for alloc in strategy.portfolio_allocations:
-        stock_ids.extend([int(sid) for sid in alloc.get('stock_allocations', {}).keys()])
+    stock_ids = {h.stock_id for h in holdings}
+    stock_ids.update(
+        int(sid)
+        for alloc in strategy.portfolio_allocations
+        for sid in alloc.get('stock_allocations', {}).keys()
+    )
     
-    stocks = {}
-    if stock_ids:
-        stocks_result = await db.execute(
-            select(Stock).where(Stock.id.in_(stock_ids))
-        )
-        stocks = {stock.id: stock for stock in stocks_result.scalars().all()}
+    stocks = await stock_service.get_stocks_by_ids(db, stock_ids)
     
     # Get portfolios
     portfolio_ids = [alloc['portfolio_id'] for alloc in strategy.portfolio_allocations]
@@ -555,7 +521,7 @@ async def export_strategy(
     return StreamingResponse(
         excel_file,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=strategy_{strategy.name.replace(' ', '_')}.xlsx"}
+        headers={"Content-Disposition": strategy.content_disposition("strategy_{}.xlsx")}
     )
 
 
@@ -597,12 +563,7 @@ async def export_strategy_history(
                 if 'stock_id' in action:
                     stock_ids.add(action['stock_id'])
     
-    stocks = {}
-    if stock_ids:
-        stocks_result = await db.execute(
-            select(Stock).where(Stock.id.in_(stock_ids))
-        )
-        stocks = {stock.id: stock for stock in stocks_result.scalars().all()}
+    stocks = await stock_service.get_stocks_by_ids(db, stock_ids)
     
     # Generate Excel
     excel_file = await import_export_service.create_strategy_history_excel(
@@ -612,6 +573,6 @@ async def export_strategy_history(
     return StreamingResponse(
         excel_file,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename=strategy_{strategy.name.replace(' ', '_')}_history.xlsx"}
+        headers={"Content-Disposition": strategy.content_disposition("strategy_{}_history.xlsx")}
     )
 
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import raiseload
 
 from app.core.database import get_db
 from app.core.security import get_current_user_id
@@ -16,7 +17,9 @@ async def list_watchlists(
     user_id: int = Depends(get_current_user_id)
 ):
     result = await db.execute(
-        select(Watchlist).where(Watchlist.user_id == user_id)
+        select(Watchlist)
+        .options(raiseload("*"))
+        .where(Watchlist.user_id == user_id)
     )
     watchlists = result.scalars().all()
     return watchlists
@@ -10,11 +10,26 @@ class Settings(BaseSettings):
     )
 
     database_url: str
+    # Connection pool; size it for concurrent (gathered) queries per worker
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 3600
+    # Open db_pool_size connections at startup instead of on first use
+    db_pool_warmup: bool = True
+    db_statement_cache_size: int = 1024
+    db_echo: bool = False
     jwt_secret: str
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7  # Refresh token valid for 7 days
     cors_origins: str = "http://localhost:3000"
+    # Worker threads for blocking calls (password hashing, sync clients);
+    # None keeps AnyIO's default of 40
+    threadpool_size: int | None = None
+    # Responses smaller than this many bytes are sent uncompressed
+    gzip_minimum_size: int = 1000
+    gzip_compresslevel: int = 5
 
     @property
     def cors_origins_list(self) -> list[str]:
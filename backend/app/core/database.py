@@ -1,9 +1,25 @@
+import asyncio
+from contextlib import AsyncExitStack
+
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
 from app.core.config import settings
 
-engine = create_async_engine(settings.database_url, echo=True)
+engine = create_async_engine(
+    settings.database_url,
+    echo=settings.db_echo,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_pre_ping=True,
+    pool_recycle=settings.db_pool_recycle,
+    connect_args={
+        # asyncpg's own statement cache and SQLAlchemy's prepared statement cache
+        "statement_cache_size": settings.db_statement_cache_size,
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+    },
+)
 AsyncSessionLocal = async_sessionmaker(
     engine,
     class_=AsyncSession,
@@ -24,3 +40,15 @@ async def get_db() -> AsyncSession:
         finally:
             await session.close()
 
+
+async def in_own_session(func, *args):
+    """Run a service call on a dedicated session so it can be gathered with others"""
+    async with AsyncSessionLocal() as session:
+        return await func(session, *args)
+
+
+async def warm_pool(size: int) -> None:
+    """Open `size` pooled connections up front so early requests skip the connect/auth handshake"""
+    # Hold them all at once; checking out one at a time would reuse a single connection
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(*[stack.enter_async_context(engine.connect()) for _ in range(size)])
@@ -1,18 +1,45 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 import base64
+import time
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from cryptography.fernet import Fernet
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.orm import load_only
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.core.database import get_db
+from app.models.user import User
+
+# New hashes use argon2id (OWASP baseline parameters); existing bcrypt
+# hashes still verify and are upgraded on the next successful login
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__memory_cost=19456,
+    argon2__time_cost=2,
+    argon2__parallelism=1
+)
 security = HTTPBearer()
 
+# Verified refresh-token payloads keyed by the raw token. Clients keep
+# presenting the same refresh token until it expires, so a hit skips the
+# signature check; expiry is still enforced from the cached "exp" claim.
+REFRESH_TOKEN_CACHE_SIZE = 4096
+_refresh_token_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+# Short-lived cache of loaded users keyed by id, so read-mostly endpoints
+# that resolve the current user do not hit the database on every request
+USER_CACHE_TTL_SECONDS = 5
+USER_CACHE_SIZE = 4096
+_user_cache: dict[int, tuple[float, User]] = {}
+
 # Initialize Fernet cipher with secret key (derived from JWT secret)
 def get_fernet_key() -> bytes:
     """Generate a Fernet key from the JWT secret"""
@@ -29,6 +56,11 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    """Verify a password, returning a replacement hash if the stored one uses a deprecated scheme"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -88,19 +120,34 @@ def decode_access_token(token: str) -> dict:
 
 
 def decode_refresh_token(token: str) -> dict:
+    payload = _refresh_token_cache.get(token)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            _refresh_token_cache.move_to_end(token)
+            return payload
+        del _refresh_token_cache[token]
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate refresh token",
+        )
+    
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        if payload.get("type") != "refresh":
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token type",
-            )
-        return payload
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate refresh token",
         )
+    if payload.get("type") != "refresh":
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token type",
+        )
+    
+    _refresh_token_cache[token] = payload
+    if len(_refresh_token_cache) > REFRESH_TOKEN_CACHE_SIZE:
+        _refresh_token_cache.popitem(last=False)
+    return payload
 
 
 async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depends(security)) -> int:
@@ -121,3 +168,38 @@ async def get_current_user_id(credentials: HTTPAuthorizationCredentials = Depend
         )
     return user_id
 
+
+
+async def get_current_user(
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+) -> User:
+    """
+    Resolve the authenticated User in a single query per request.
+
+    Results are cached for a few seconds, so the returned instance may be
+    detached from ``db``; treat it as read-only.
+    """
+    cached = _user_cache.get(user_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    
+    # Skip password_hash; accessing unloaded columns raises instead of lazy-loading
+    result = await db.execute(
+        select(User)
+        .options(load_only(User.id, User.email, User.created_at, raiseload=True))
+        .where(User.id == user_id)
+    )
+    user = result.scalar_one_or_none()
+    
+    if not user:
+        _user_cache.pop(user_id, None)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    _user_cache[user_id] = (time.monotonic() + USER_CACHE_TTL_SECONDS, user)
+    if len(_user_cache) > USER_CACHE_SIZE:
+        _user_cache.pop(next(iter(_user_cache)))
+    return user
@@ -1,21 +1,34 @@
 from contextlib import asynccontextmanager
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 
 from app.core.config import settings
-from app.core.database import engine
+from app.core.database import engine, warm_pool
 from app.api.routes import auth, stocks, portfolios, strategies, holdings, watchlists, tradingview
 from app.services.tradingview_service import tradingview_service
+from app.services.holding_write_batcher import holding_write_batcher
+from app.services.portfolio_service import portfolio_service
 from app.core.database import AsyncSessionLocal
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Initialize EGX stocks
+    # Startup: Size the threadpool used by run_in_threadpool
+    if settings.threadpool_size:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = settings.threadpool_size
+    
+    if settings.db_pool_warmup:
+        await warm_pool(settings.db_pool_size)
+    
+    # Initialize EGX stocks and make sure snapshot partitions exist ahead
     async with AsyncSessionLocal() as db:
         await tradingview_service.initialize_egx_stocks(db)
+        await portfolio_service.ensure_snapshot_partitions(db)
     yield
     # Shutdown
+    await holding_write_batcher.close()
     await engine.dispose()
 
 
@@ -35,6 +48,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large JSON responses (stock lists, history, holdings)
+app.add_middleware(
+    GZipMiddleware,
+    minimum_size=settings.gzip_minimum_size,
+    compresslevel=settings.gzip_compresslevel,
+)
+
 # Include routers
 app.include_router(auth.router, prefix="/api")
 app.include_router(stocks.router, prefix="/api")
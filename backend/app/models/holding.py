@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, Float, ForeignKey, Boolean, Text, DateTime
+from sqlalchemy import Integer, Float, ForeignKey, Boolean, Text, DateTime, Index, false, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime
 from typing import Optional
@@ -8,11 +8,26 @@ from app.core.database import Base
 
 class Holding(Base):
     __tablename__ = "holdings"
+    __table_args__ = (
+        Index(
+            "ix_holdings_user_strategy",
+            "user_id",
+            "strategy_id",
+            postgresql_include=["stock_id", "quantity", "average_price", "current_value"]
+        ),
+        Index("ix_holdings_user_portfolio", "user_id", "portfolio_id"),
+        # Partial index for the unmapped holdings list
+        Index(
+            "ix_holdings_unmapped",
+            "user_id",
+            postgresql_where=text("strategy_id IS NULL AND portfolio_id IS NULL")
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
     strategy_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("strategies.id"), nullable=True)
-    portfolio_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("portfolios.id"), nullable=True)
+    portfolio_id: Mapped[Optional[int]] = mapped_column(Integer, ForeignKey("portfolios.id", ondelete="SET NULL"), nullable=True)
     stock_id: Mapped[int] = mapped_column(Integer, ForeignKey("stocks.id"), nullable=False)
     quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
     average_price: Mapped[float] = mapped_column(Float, nullable=False)
@@ -21,11 +36,12 @@ class Holding(Base):
     # Manual holdings fields
     purchase_date: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
-    is_manual: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    is_manual: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false(), nullable=False)
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="holdings")
-    strategy: Mapped[Optional["Strategy"]] = relationship(back_populates="holdings")
-    portfolio: Mapped[Optional["Portfolio"]] = relationship("Portfolio", back_populates="holdings")
-    stock: Mapped["Stock"] = relationship()
+    # lazy="raise" so a missing selectinload fails loudly instead of issuing a hidden query
+    strategy: Mapped[Optional["Strategy"]] = relationship(back_populates="holdings", lazy="raise")
+    portfolio: Mapped[Optional["Portfolio"]] = relationship("Portfolio", back_populates="holdings", lazy="raise")
+    stock: Mapped["Stock"] = relationship(lazy="raise")
 
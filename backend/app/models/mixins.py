@@ -0,0 +1,24 @@
+import re
+from urllib.parse import quote
+
+_UNSAFE_FILENAME_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+class DownloadNameMixin:
+    """Download-filename helpers for models with a user-supplied `name`"""
+
+    @property
+    def safe_filename(self) -> str:
+        """Name with anything but letters, digits, '.', '-' and '_' replaced, for download filenames"""
+        return _UNSAFE_FILENAME_CHARS.sub("_", self.name)
+
+    def content_disposition(self, template: str) -> str:
+        """Attachment header for `template` filled with the name, e.g. "portfolio_{}.xlsx"
+
+        Pairs the ASCII-safe filename with an RFC 5987 filename* so clients
+        that understand it keep the original (e.g. Arabic) name
+        """
+        return (
+            f"attachment; filename={template.format(self.safe_filename)}; "
+            f"filename*=UTF-8''{quote(template.format(self.name), safe='')}"
+        )
@@ -1,12 +1,15 @@
 from datetime import datetime
-from sqlalchemy import String, DateTime, Integer, ForeignKey, ARRAY
+from sqlalchemy import String, DateTime, Integer, ForeignKey, ARRAY, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.database import Base
+from app.models.mixins import DownloadNameMixin
 
-
-class Portfolio(Base):
+class Portfolio(DownloadNameMixin, Base):
     __tablename__ = "portfolios"
+    __table_args__ = (
+        Index("ix_portfolios_user_id_id", "user_id", "id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -16,7 +19,15 @@ class Portfolio(Base):
 
     # Relationships
     user: Mapped["User"] = relationship(back_populates="portfolios")
-    snapshots: Mapped[list["PortfolioSnapshot"]] = relationship(back_populates="portfolio", cascade="all, delete-orphan")
-    history: Mapped[list["PortfolioHistory"]] = relationship(back_populates="portfolio", cascade="all, delete-orphan")
-    holdings: Mapped[list["Holding"]] = relationship("Holding", back_populates="portfolio", foreign_keys="[Holding.portfolio_id]")
-
+    # Dependants are cleaned up by the database's ON DELETE rules
+    snapshots: Mapped[list["PortfolioSnapshot"]] = relationship(back_populates="portfolio", cascade="all, delete-orphan", passive_deletes=True)
+    history: Mapped[list["PortfolioHistory"]] = relationship(back_populates="portfolio", cascade="all, delete-orphan", passive_deletes=True)
+    holdings: Mapped[list["Holding"]] = relationship("Holding", back_populates="portfolio", foreign_keys="[Holding.portfolio_id]", passive_deletes=True)
+    # Read-only view of the stocks referenced by stock_ids
+    stocks: Mapped[list["Stock"]] = relationship(
+        "Stock",
+        primaryjoin="Stock.id == any_(foreign(Portfolio.stock_ids))",
+        viewonly=True,
+        uselist=True,
+        lazy="raise"
+    )
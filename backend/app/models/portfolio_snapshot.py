@@ -1,5 +1,6 @@
 from datetime import datetime
-from sqlalchemy import DateTime, Integer, Float, ForeignKey, JSON
+from sqlalchemy import DateTime, Index, Integer, ForeignKey, Numeric, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.database import Base
@@ -7,14 +8,19 @@ from app.core.database import Base
 
 class PortfolioSnapshot(Base):
     __tablename__ = "portfolio_snapshots"
+    __table_args__ = (
+        Index("ix_portfolio_snapshots_portfolio_date", "portfolio_id", text("snapshot_date DESC")),
+        # Monthly RANGE partitions; the partition key is part of the primary key
+        {"postgresql_partition_by": "RANGE (snapshot_date)"},
+    )
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
-    portfolio_id: Mapped[int] = mapped_column(Integer, ForeignKey("portfolios.id"), nullable=False, index=True)
-    snapshot_date: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
-    total_value: Mapped[float] = mapped_column(Float, nullable=False)
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    portfolio_id: Mapped[int] = mapped_column(Integer, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False)
+    snapshot_date: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    total_value: Mapped[float] = mapped_column(Numeric(18, 4, asdecimal=False), nullable=False)
     stock_count: Mapped[int] = mapped_column(Integer, nullable=False)
     # stock_prices structure: {"stock_id": price}
-    stock_prices: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict)
+    stock_prices: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     # Relationships
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import String, Float, DateTime
+from sqlalchemy import String, Float, DateTime, Numeric, Index
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.database import Base
@@ -7,6 +7,11 @@ from app.core.database import Base
 
 class Stock(Base):
     __tablename__ = "stocks"
+    __table_args__ = (
+        # Trigram indexes for the ILIKE '%term%' search in list_stocks
+        Index("ix_stocks_symbol_trgm", "symbol", postgresql_using="gin", postgresql_ops={"symbol": "gin_trgm_ops"}),
+        Index("ix_stocks_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     symbol: Mapped[str] = mapped_column(String(50), unique=True, index=True, nullable=False)
@@ -16,12 +21,12 @@ class Stock(Base):
     logo_url: Mapped[str] = mapped_column(String(500), nullable=True)
     sector: Mapped[str] = mapped_column(String(100), nullable=True)
     industry: Mapped[str] = mapped_column(String(100), nullable=True)
-    open_price: Mapped[float] = mapped_column(Float, nullable=True)
-    high_price: Mapped[float] = mapped_column(Float, nullable=True)
-    low_price: Mapped[float] = mapped_column(Float, nullable=True)
+    open_price: Mapped[float] = mapped_column(Numeric(18, 4, asdecimal=False), nullable=True)
+    high_price: Mapped[float] = mapped_column(Numeric(18, 4, asdecimal=False), nullable=True)
+    low_price: Mapped[float] = mapped_column(Numeric(18, 4, asdecimal=False), nullable=True)
     volume: Mapped[float] = mapped_column(Float, nullable=True)
-    change: Mapped[float] = mapped_column(Float, nullable=True)
-    change_percent: Mapped[float] = mapped_column(Float, nullable=True)
+    change: Mapped[float] = mapped_column(Numeric(18, 4, asdecimal=False), nullable=True)
+    change_percent: Mapped[float] = mapped_column(Numeric(18, 4, asdecimal=False), nullable=True)
     recommendation: Mapped[str] = mapped_column(String(50), nullable=True)
     market_cap: Mapped[float] = mapped_column(Float, nullable=True)
     pe_ratio: Mapped[float] = mapped_column(Float, nullable=True)
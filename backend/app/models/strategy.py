@@ -3,9 +3,9 @@ from sqlalchemy import String, DateTime, Integer, Float, ForeignKey, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.database import Base
+from app.models.mixins import DownloadNameMixin
 
-
-class Strategy(Base):
+class Strategy(DownloadNameMixin, Base):
     __tablename__ = "strategies"
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
@@ -23,4 +23,3 @@ class Strategy(Base):
     holdings: Mapped[list["Holding"]] = relationship(back_populates="strategy", cascade="all, delete-orphan")
     snapshots: Mapped[list["StrategySnapshot"]] = relationship(back_populates="strategy", cascade="all, delete-orphan")
     rebalancing_history: Mapped[list["RebalancingHistory"]] = relationship(back_populates="strategy", cascade="all, delete-orphan")
-
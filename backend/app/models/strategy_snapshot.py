@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import DateTime, Integer, Float, ForeignKey
+from sqlalchemy import DateTime, Index, Integer, Float, ForeignKey, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.core.database import Base
@@ -7,6 +7,9 @@ from app.core.database import Base
 
 class StrategySnapshot(Base):
     __tablename__ = "strategy_snapshots"
+    __table_args__ = (
+        Index("ix_strategy_snapshots_strategy_date", "strategy_id", text("snapshot_date DESC")),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     strategy_id: Mapped[int] = mapped_column(Integer, ForeignKey("strategies.id"), nullable=False)
@@ -9,7 +9,7 @@ from app.core.database import Base
 class TradingViewCredential(Base):
     __tablename__ = "tradingview_credentials"
 
-    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), unique=True, nullable=False)
     username: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     encrypted_password: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Encrypted (deprecated)
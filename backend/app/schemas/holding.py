@@ -57,3 +57,9 @@ class CSVHoldingImport(BaseModel):
     purchase_date: Optional[str] = None
     notes: Optional[str] = None
 
+
+
+class PortfolioHoldingsValue(BaseModel):
+    portfolio_id: int
+    total_value: float
+    stock_count: int
@@ -46,6 +46,27 @@ class StockResponse(StockBase):
         from_attributes = True
 
 
+
+class StockListItem(BaseModel):
+    """Row of the stock list/grid views; the full record comes from GET /stocks/{id}"""
+    id: int
+    symbol: str
+    name: str
+    exchange: str
+    current_price: float
+    change_percent: float | None = None
+    logo_url: str | None = None
+    sector: str | None = None
+    industry: str | None = None
+    volume: float | None = None
+    recommendation: str | None = None
+    market_cap: float | None = None
+    pe_ratio: float | None = None
+    dividend_yield: float | None = None
+
+    class Config:
+        from_attributes = True
+
 class StockDetailResponse(StockResponse):
     """Detailed stock response with technical analysis"""
     open_price: float | None = None
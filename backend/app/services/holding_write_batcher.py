@@ -0,0 +1,108 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert
+
+from app.core.database import AsyncSessionLocal
+from app.models.holding import Holding
+
+
+class HoldingWriteBatcher:
+    """Coalesces concurrent single-holding inserts into multi-row INSERTs"""
+
+    def __init__(self, max_batch_size: int = 100, max_delay: float = 0.005):
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def insert(self, values: Dict[str, Any]) -> int:
+        """Queue a holding insert and wait until its batch is committed; returns the new id"""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+        future = loop.create_future()
+        await self._queue.put((values, future))
+        return await future
+
+    async def close(self) -> None:
+        """Stop the worker and fail anything still queued"""
+        if self._worker is None:
+            return
+
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
+        pending = []
+        while not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        self._fail(pending, RuntimeError("Holding write batcher closed"))
+        self._worker = None
+
+    async def _run(self) -> None:
+        batch: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+
+                # Give concurrent writers a moment to join this batch
+                await asyncio.sleep(self.max_delay)
+                while len(batch) < self.max_batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+
+                await self._flush(batch)
+        except asyncio.CancelledError:
+            # Cancelled mid-batch by close(); don't leave those callers waiting
+            self._fail(batch, RuntimeError("Holding write batcher closed"))
+            raise
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        try:
+            holding_ids = await self._insert([values for values, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch, e)
+                return
+
+            # One bad row (e.g. a missing stock id) fails the whole INSERT;
+            # retry row by row so only its caller sees the error
+            for values, future in batch:
+                try:
+                    holding_id, = await self._insert([values])
+                except Exception as row_error:
+                    self._fail([(values, future)], row_error)
+                else:
+                    if not future.done():
+                        future.set_result(holding_id)
+            return
+
+        for (_, future), holding_id in zip(batch, holding_ids):
+            if not future.done():
+                future.set_result(holding_id)
+
+    async def _insert(self, rows: List[Dict[str, Any]]) -> List[int]:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                insert(Holding).returning(Holding.id, sort_by_parameter_order=True),
+                rows
+            )
+            holding_ids = result.scalars().all()
+            await session.commit()
+        return holding_ids
+
+    @staticmethod
+    def _fail(batch: List[Tuple[Dict[str, Any], asyncio.Future]], error: BaseException) -> None:
+        for _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+
+
+# Create singleton instance
+holding_write_batcher = HoldingWriteBatcher()
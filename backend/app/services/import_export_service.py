@@ -1,7 +1,9 @@
-from io import BytesIO
+from io import BytesIO, TextIOWrapper
+from tempfile import SpooledTemporaryFile
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, BinaryIO, Iterator, Tuple
 import csv
+import anyio.to_thread
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, PatternFill, Alignment
 from openpyxl.utils import get_column_letter
@@ -16,9 +18,20 @@ from app.models.portfolio_history import PortfolioHistory
 from app.models.rebalancing_history import RebalancingHistory
 
 
+# Exports larger than this are spooled to a temporary file instead of memory
+_SPOOL_MAX_SIZE = 1024 * 1024
+
+
 class ImportExportService:
     """Service for handling import/export of portfolios, strategies, and holdings"""
     
+    def _save_workbook(self, wb: Workbook) -> BinaryIO:
+        """Save a workbook for streaming; large files spill to disk instead of memory"""
+        output = SpooledTemporaryFile(max_size=_SPOOL_MAX_SIZE)
+        wb.save(output)
+        output.seek(0)
+        return output
+    
     # ===== TEMPLATE GENERATION =====
     
     def generate_portfolio_template(self) -> BytesIO:
@@ -74,12 +87,21 @@ class ImportExportService:
     # ===== PORTFOLIO EXPORT =====
     
     async def create_portfolio_excel(
-        self, 
-        db: AsyncSession, 
+        self,
+        db: AsyncSession,
         portfolio: Portfolio,
         stocks: List[Stock]
-    ) -> BytesIO:
+    ) -> BinaryIO:
         """Generate Excel export for a single portfolio"""
+        # openpyxl is CPU-bound, so every export builds its workbook in a worker
+        # thread; the ORM objects passed in must already be fully loaded
+        return await anyio.to_thread.run_sync(self._build_portfolio_excel, portfolio, stocks)
+    
+    def _build_portfolio_excel(
+        self,
+        portfolio: Portfolio,
+        stocks: List[Stock]
+    ) -> BinaryIO:
         wb = Workbook()
         ws = wb.active
         ws.title = "Portfolio Details"
@@ -120,33 +142,35 @@ class ImportExportService:
         ws.column_dimensions['D'].width = 15
         ws.column_dimensions['E'].width = 12
         
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output
+        return self._save_workbook(wb)
     
     async def create_all_portfolios_excel(
-        self, 
-        db: AsyncSession, 
-        portfolios: List[Portfolio],
-        all_stocks: Dict[int, Stock]
-    ) -> BytesIO:
-        """Generate Excel export for all user portfolios"""
+        self,
+        db: AsyncSession,
+        portfolios: List[Tuple[str, datetime, List[Any]]]
+    ) -> BinaryIO:
+        """Generate Excel export for all user portfolios from (name, created_at, stock rows) groups"""
+        return await anyio.to_thread.run_sync(self._build_all_portfolios_excel, portfolios)
+    
+    def _build_all_portfolios_excel(
+        self,
+        portfolios: List[Tuple[str, datetime, List[Any]]]
+    ) -> BinaryIO:
         wb = Workbook()
         wb.remove(wb.active)  # Remove default sheet
         
         header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
         header_font = Font(bold=True, color="FFFFFF")
         
-        for portfolio in portfolios:
+        for name, created_at, stocks in portfolios:
             # Create sheet for each portfolio
-            ws = wb.create_sheet(title=portfolio.name[:31])  # Excel sheet name limit
+            ws = wb.create_sheet(title=name[:31])  # Excel sheet name limit
             
             # Portfolio info
             ws.cell(row=1, column=1, value="Portfolio:").font = Font(bold=True)
-            ws.cell(row=1, column=2, value=portfolio.name)
+            ws.cell(row=1, column=2, value=name)
             ws.cell(row=2, column=1, value="Created:")
-            ws.cell(row=2, column=2, value=portfolio.created_at.strftime("%Y-%m-%d"))
+            ws.cell(row=2, column=2, value=created_at.strftime("%Y-%m-%d"))
             
             # Headers
             headers = ["Symbol", "Name", "Sector", "Current Price", "Change %"]
@@ -156,7 +180,6 @@ class ImportExportService:
                 cell.font = header_font
             
             # Stock data
-            stocks = [all_stocks[sid] for sid in portfolio.stock_ids if sid in all_stocks]
             for row_idx, stock in enumerate(stocks, 5):
                 ws.cell(row=row_idx, column=1, value=stock.symbol)
                 ws.cell(row=row_idx, column=2, value=stock.name)
@@ -171,18 +194,22 @@ class ImportExportService:
             ws.column_dimensions['D'].width = 15
             ws.column_dimensions['E'].width = 12
         
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output
+        return self._save_workbook(wb)
     
     async def create_portfolio_history_excel(
-        self, 
+        self,
         db: AsyncSession,
         portfolio: Portfolio,
         history: List[PortfolioHistory]
-    ) -> BytesIO:
+    ) -> BinaryIO:
         """Generate Excel export for portfolio history"""
+        return await anyio.to_thread.run_sync(self._build_portfolio_history_excel, portfolio, history)
+    
+    def _build_portfolio_history_excel(
+        self,
+        portfolio: Portfolio,
+        history: List[PortfolioHistory]
+    ) -> BinaryIO:
         wb = Workbook()
         ws = wb.active
         ws.title = "Portfolio History"
@@ -213,10 +240,7 @@ class ImportExportService:
         ws.column_dimensions['C'].width = 40
         ws.column_dimensions['D'].width = 50
         
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output
+        return self._save_workbook(wb)
     
     # ===== STRATEGY EXPORT =====
     
@@ -227,8 +251,17 @@ class ImportExportService:
         holdings: List[Holding],
         stocks: Dict[int, Stock],
         portfolios: Dict[int, Portfolio]
-    ) -> BytesIO:
+    ) -> BinaryIO:
         """Generate Excel export for strategy with multiple sheets"""
+        return await anyio.to_thread.run_sync(self._build_strategy_excel, strategy, holdings, stocks, portfolios)
+    
+    def _build_strategy_excel(
+        self,
+        strategy: Strategy,
+        holdings: List[Holding],
+        stocks: Dict[int, Stock],
+        portfolios: Dict[int, Portfolio]
+    ) -> BinaryIO:
         wb = Workbook()
         wb.remove(wb.active)
         
@@ -309,10 +342,7 @@ class ImportExportService:
         ws_hold.column_dimensions['H'].width = 15
         ws_hold.column_dimensions['I'].width = 30
         
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output
+        return self._save_workbook(wb)
     
     async def create_strategy_history_excel(
         self,
@@ -320,8 +350,16 @@ class ImportExportService:
         strategy: Strategy,
         history: List[RebalancingHistory],
         stocks: Dict[int, Stock]
-    ) -> BytesIO:
+    ) -> BinaryIO:
         """Generate Excel export for strategy rebalancing history"""
+        return await anyio.to_thread.run_sync(self._build_strategy_history_excel, strategy, history, stocks)
+    
+    def _build_strategy_history_excel(
+        self,
+        strategy: Strategy,
+        history: List[RebalancingHistory],
+        stocks: Dict[int, Stock]
+    ) -> BinaryIO:
         wb = Workbook()
         ws = wb.active
         ws.title = "Rebalancing History"
@@ -361,10 +399,7 @@ class ImportExportService:
         ws.column_dimensions['C'].width = 12
         ws.column_dimensions['D'].width = 60
         
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output
+        return self._save_workbook(wb)
     
     # ===== HOLDINGS EXPORT =====
     
@@ -373,10 +408,19 @@ class ImportExportService:
         db: AsyncSession,
         holdings: List[Holding],
         stocks: Dict[int, Stock],
-        strategies: Dict[int, Strategy],
-        portfolios: Dict[int, Portfolio]
-    ) -> BytesIO:
+        strategy_names: Dict[int, str],
+        portfolio_names: Dict[int, str]
+    ) -> BinaryIO:
         """Generate Excel export for all holdings"""
+        return await anyio.to_thread.run_sync(self._build_holdings_excel, holdings, stocks, strategy_names, portfolio_names)
+    
+    def _build_holdings_excel(
+        self,
+        holdings: List[Holding],
+        stocks: Dict[int, Stock],
+        strategy_names: Dict[int, str],
+        portfolio_names: Dict[int, str]
+    ) -> BinaryIO:
         wb = Workbook()
         ws = wb.active
         ws.title = "All Holdings"
@@ -417,10 +461,8 @@ class ImportExportService:
             ws.cell(row=row_idx, column=7, value=holding.current_value)
             
             # Strategy and Portfolio names
-            strategy = strategies.get(holding.strategy_id) if holding.strategy_id else None
-            portfolio = portfolios.get(holding.portfolio_id) if holding.portfolio_id else None
-            ws.cell(row=row_idx, column=10, value=strategy.name if strategy else "")
-            ws.cell(row=row_idx, column=11, value=portfolio.name if portfolio else "")
+            ws.cell(row=row_idx, column=10, value=strategy_names.get(holding.strategy_id, ""))
+            ws.cell(row=row_idx, column=11, value=portfolio_names.get(holding.portfolio_id, ""))
             
             ws.cell(row=row_idx, column=12, value=holding.purchase_date.strftime("%Y-%m-%d") if holding.purchase_date else "")
             ws.cell(row=row_idx, column=13, value=holding.notes or "")
@@ -433,10 +475,7 @@ class ImportExportService:
         ws.column_dimensions['C'].width = 20  # Sector
         ws.column_dimensions['M'].width = 30  # Notes
         
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output
+        return self._save_workbook(wb)
     
     # ===== COMPARISON EXPORT =====
     
@@ -444,8 +483,14 @@ class ImportExportService:
         self,
         db: AsyncSession,
         comparison_data: List[Dict[str, Any]]
-    ) -> BytesIO:
+    ) -> BinaryIO:
         """Generate Excel export for portfolio comparison"""
+        return await anyio.to_thread.run_sync(self._build_comparison_excel, comparison_data)
+    
+    def _build_comparison_excel(
+        self,
+        comparison_data: List[Dict[str, Any]]
+    ) -> BinaryIO:
         wb = Workbook()
         wb.remove(wb.active)
         
@@ -495,22 +540,24 @@ class ImportExportService:
                 ws.column_dimensions['A'].width = 20
                 ws.column_dimensions['B'].width = 15
         
-        output = BytesIO()
-        wb.save(output)
-        output.seek(0)
-        return output
+        return self._save_workbook(wb)
     
     # ===== IMPORT PARSING =====
     
-    async def parse_portfolio_csv(self, file_content: bytes) -> List[Dict[str, Any]]:
-        """Parse portfolio CSV file"""
-        content = file_content.decode('utf-8')
-        csv_reader = csv.DictReader(content.splitlines())
-        
+    def _iter_csv(self, file: BinaryIO) -> Iterator[Dict[str, str]]:
+        """Read CSV rows straight from an uploaded file, one line at a time"""
+        text = TextIOWrapper(file, encoding='utf-8', newline='')
+        try:
+            yield from csv.DictReader(text)
+        finally:
+            # Leave the upload itself open for its owner to close
+            text.detach()
+    
+    def _parse_portfolio_csv(self, file: BinaryIO) -> List[Dict[str, Any]]:
         portfolios = []
-        for row in csv_reader:
-            portfolio_name = row.get('Portfolio Name', '').strip()
-            stock_symbols = row.get('Stock Symbols', '').strip()
+        for row in self._iter_csv(file):
+            portfolio_name = (row.get('Portfolio Name') or '').strip()
+            stock_symbols = (row.get('Stock Symbols') or '').strip()
             
             if portfolio_name and stock_symbols:
                 # Split stock symbols by comma
@@ -522,13 +569,42 @@ class ImportExportService:
         
         return portfolios
     
+    async def parse_portfolio_csv(self, file: BinaryIO) -> List[Dict[str, Any]]:
+        """Parse portfolio CSV file (read and parsed in a worker thread)"""
+        return await anyio.to_thread.run_sync(self._parse_portfolio_csv, file)
+    
+    def _parse_holdings_csv(self, file: BinaryIO) -> List[Dict[str, Any]]:
+        holdings = []
+        for row in self._iter_csv(file):
+            symbol = (row.get('Stock Symbol') or '').strip().upper()
+            if not symbol:
+                continue
+            
+            holdings.append({
+                'stock_symbol': symbol,
+                'quantity': (row.get('Quantity') or '0').strip(),
+                'purchase_price': (row.get('Purchase Price') or '0').strip(),
+                'purchase_date': (row.get('Purchase Date') or '').strip() or None,
+                'notes': (row.get('Notes') or '').strip() or None
+            })
+        
+        return holdings
+    
+    async def parse_holdings_csv(self, file: BinaryIO) -> List[Dict[str, Any]]:
+        """Parse manual holdings CSV file (read and parsed in a worker thread)"""
+        return await anyio.to_thread.run_sync(self._parse_holdings_csv, file)
+    
     async def parse_strategy_excel(
         self, 
-        file_content: bytes,
+        file: BinaryIO,
         db: AsyncSession
     ) -> Dict[str, Any]:
-        """Parse strategy Excel file with holdings data"""
-        wb = load_workbook(BytesIO(file_content))
+        """Parse strategy Excel file with holdings data (read in a worker thread)"""
+        return await anyio.to_thread.run_sync(self._parse_strategy_excel, file)
+    
+    def _parse_strategy_excel(self, file: BinaryIO) -> Dict[str, Any]:
+        # Read-only mode streams rows from the file instead of building the whole sheet
+        wb = load_workbook(file, read_only=True)
         ws = wb.active
         
         holdings = []
@@ -562,6 +638,7 @@ class ImportExportService:
                 'notes': notes
             })
         
+        wb.close()
         return {'holdings': holdings}
 
 
@@ -1,17 +1,49 @@
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
+import json
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, insert, update, func, table, column, text, cast, Float
+from sqlalchemy.dialects.postgresql import JSONB
 
 from app.models.portfolio import Portfolio
 from app.models.portfolio_snapshot import PortfolioSnapshot
 from app.models.portfolio_history import PortfolioHistory
 from app.models.stock import Stock
+from app.models.holding import Holding
+
+# Materialized view of holdings market value per portfolio
+# (see migration l1m2n3o4p5q6)
+portfolio_current_value = table(
+    "portfolio_current_value",
+    column("portfolio_id"),
+    column("total_value"),
+    column("stock_count")
+)
 
 
 class PortfolioService:
     """Service for portfolio operations including snapshots, performance tracking, and analytics."""
 
+    # calculate_performance results are reused for this many seconds, and
+    # dropped early whenever the portfolio gets a new snapshot
+    PERFORMANCE_CACHE_TTL = 60.0
+    PERFORMANCE_CACHE_MAX_SIZE = 1024
+
+    # Monthly portfolio_snapshots partitions kept ahead of the current month
+    SNAPSHOT_PARTITION_MONTHS_AHEAD = 12
+
+    def __init__(self):
+        # portfolio_id -> (expires_at, performance)
+        self._performance_cache: Dict[int, Tuple[float, Dict[str, Any]]] = {}
+        # (year, month) partitions were last rolled forward in this process
+        self._partitions_ensured_for: Optional[Tuple[int, int]] = None
+
+    def invalidate_performance(self, *portfolio_ids: int) -> None:
+        """Drop cached performance for the given portfolios"""
+        for portfolio_id in portfolio_ids:
+            self._performance_cache.pop(portfolio_id, None)
+
     async def create_snapshot(
         self,
         db: AsyncSession,
@@ -32,28 +64,24 @@ class PortfolioService:
         if snapshot_date is None:
             snapshot_date = datetime.utcnow()
 
-        # Get portfolio
-        result = await db.execute(
-            select(Portfolio).where(Portfolio.id == portfolio_id)
-        )
-        portfolio = result.scalar_one_or_none()
+        # Get portfolio (primary-key lookup, served from the identity map if loaded)
+        portfolio = await db.get(Portfolio, portfolio_id)
         
         if not portfolio:
             raise ValueError(f"Portfolio {portfolio_id} not found")
 
-        # Get stocks in portfolio
+        # Get prices of the stocks in the portfolio; nothing else is needed
         stock_result = await db.execute(
-            select(Stock).where(Stock.id.in_(portfolio.stock_ids))
+            select(Stock.id, Stock.current_price).where(Stock.id.in_(portfolio.stock_ids))
         )
-        stocks = stock_result.scalars().all()
 
         # Build stock prices map and calculate total value
         stock_prices = {}
         total_value = 0.0
         
-        for stock in stocks:
-            stock_prices[str(stock.id)] = stock.current_price
-            total_value += stock.current_price
+        for stock_id, current_price in stock_result.all():
+            stock_prices[str(stock_id)] = current_price
+            total_value += current_price
 
         # Create snapshot
         snapshot = PortfolioSnapshot(
@@ -67,9 +95,68 @@ class PortfolioService:
         db.add(snapshot)
         await db.commit()
         await db.refresh(snapshot)
+        self.invalidate_performance(portfolio_id)
 
         return snapshot
 
+    async def create_snapshots_bulk(
+        self,
+        db: AsyncSession,
+        portfolio_ids: List[int],
+        snapshot_date: Optional[datetime] = None
+    ) -> int:
+        """
+        Create snapshots for many portfolios with batched multi-row INSERTs.
+        
+        Args:
+            db: Database session
+            portfolio_ids: IDs of the portfolios to snapshot
+            snapshot_date: Date for the snapshots (defaults to now)
+            
+        Returns:
+            Number of snapshots created
+        """
+        if not portfolio_ids:
+            return 0
+
+        if snapshot_date is None:
+            snapshot_date = datetime.utcnow()
+
+        # Get portfolios and every stock they reference in two queries
+        result = await db.execute(
+            select(Portfolio.id, Portfolio.stock_ids).where(Portfolio.id.in_(portfolio_ids))
+        )
+        portfolios = result.all()
+
+        all_stock_ids = {stock_id for _, stock_ids in portfolios for stock_id in stock_ids}
+        price_result = await db.execute(
+            select(Stock.id, Stock.current_price).where(Stock.id.in_(all_stock_ids))
+        )
+        prices = dict(price_result.all())
+
+        rows = []
+        for portfolio_id, stock_ids in portfolios:
+            stock_prices = {
+                str(stock_id): prices[stock_id]
+                for stock_id in stock_ids
+                if stock_id in prices
+            }
+            rows.append({
+                "portfolio_id": portfolio_id,
+                "snapshot_date": snapshot_date,
+                "total_value": sum(stock_prices.values()),
+                "stock_count": len(stock_ids),
+                "stock_prices": stock_prices
+            })
+
+        # Executemany form so SQLAlchemy splits the rows into batches under
+        # the bind parameter limit, however many portfolios there are
+        await db.execute(insert(PortfolioSnapshot), rows)
+        await db.commit()
+        self.invalidate_performance(*(row["portfolio_id"] for row in rows))
+
+        return len(rows)
+
     async def calculate_performance(
         self,
         db: AsyncSession,
@@ -83,31 +170,57 @@ class PortfolioService:
             portfolio_id: ID of the portfolio
             
         Returns:
-            Dictionary with performance metrics
+            Dictionary with performance metrics (cached for PERFORMANCE_CACHE_TTL seconds)
         """
-        # Get portfolio
+        now = time.monotonic()
+        cached = self._performance_cache.get(portfolio_id)
+        if cached and cached[0] > now:
+            return cached[1]
+
+        performance = await self._compute_performance(db, portfolio_id)
+
+        if len(self._performance_cache) >= self.PERFORMANCE_CACHE_MAX_SIZE:
+            # Drop expired entries, then the oldest if still full
+            for key in [key for key, (expires_at, _) in self._performance_cache.items() if expires_at <= now]:
+                del self._performance_cache[key]
+            if len(self._performance_cache) >= self.PERFORMANCE_CACHE_MAX_SIZE:
+                del self._performance_cache[next(iter(self._performance_cache))]
+        self._performance_cache[portfolio_id] = (now + self.PERFORMANCE_CACHE_TTL, performance)
+
+        return performance
+
+    async def _compute_performance(
+        self,
+        db: AsyncSession,
+        portfolio_id: int
+    ) -> Dict[str, Any]:
+        # Get portfolio with its current value summed by the database
+        current_value_subquery = (
+            select(func.coalesce(func.sum(Stock.current_price), 0.0))
+            .where(Stock.id == func.any(Portfolio.stock_ids))
+            .scalar_subquery()
+        )
         result = await db.execute(
-            select(Portfolio).where(Portfolio.id == portfolio_id)
+            select(
+                Portfolio.created_at,
+                func.cardinality(Portfolio.stock_ids),
+                current_value_subquery
+            ).where(Portfolio.id == portfolio_id)
         )
-        portfolio = result.scalar_one_or_none()
+        portfolio = result.one_or_none()
         
         if not portfolio:
             raise ValueError(f"Portfolio {portfolio_id} not found")
+        
+        created_at, stock_count, current_value = portfolio
 
         # Get all snapshots ordered by date
         snapshots_result = await db.execute(
-            select(PortfolioSnapshot)
+            select(PortfolioSnapshot.snapshot_date, PortfolioSnapshot.total_value)
             .where(PortfolioSnapshot.portfolio_id == portfolio_id)
             .order_by(PortfolioSnapshot.snapshot_date.asc())
         )
-        snapshots = snapshots_result.scalars().all()
-
-        # Calculate current value
-        stock_result = await db.execute(
-            select(Stock).where(Stock.id.in_(portfolio.stock_ids))
-        )
-        stocks = stock_result.scalars().all()
-        current_value = sum(stock.current_price for stock in stocks)
+        snapshots = snapshots_result.all()
 
         # Get initial value (first snapshot or current if no snapshots)
         if snapshots:
@@ -115,7 +228,7 @@ class PortfolioService:
             initial_date = snapshots[0].snapshot_date
         else:
             initial_value = current_value
-            initial_date = portfolio.created_at
+            initial_date = created_at
 
         # Calculate performance
         change = current_value - initial_value
@@ -143,7 +256,7 @@ class PortfolioService:
             "change_percent": change_percent,
             "initial_date": initial_date.isoformat(),
             "time_series": time_series,
-            "stock_count": len(portfolio.stock_ids)
+            "stock_count": stock_count or 0
         }
 
     async def calculate_sector_allocation(
@@ -161,66 +274,39 @@ class PortfolioService:
         Returns:
             List of sector allocations with performance data
         """
-        # Get portfolio
-        result = await db.execute(
-            select(Portfolio).where(Portfolio.id == portfolio_id)
+        # Group the portfolio's stocks by sector in the database; each
+        # stock carries equal weight, so allocation is its share of the count
+        sector = func.coalesce(Stock.sector, "Unknown")
+        stock_count = func.count(Stock.id)
+        change_percent = func.coalesce(Stock.change_percent, 0.0)
+        allocation_percent = cast(
+            stock_count * 100.0 / func.sum(stock_count).over(), Float
         )
-        portfolio = result.scalar_one_or_none()
-        
-        if not portfolio:
-            raise ValueError(f"Portfolio {portfolio_id} not found")
-
-        # Get stocks in portfolio
-        stock_result = await db.execute(
-            select(Stock).where(Stock.id.in_(portfolio.stock_ids))
+        result = await db.execute(
+            select(
+                sector.label("sector"),
+                allocation_percent.label("allocation_percent"),
+                stock_count.label("stock_count"),
+                cast(func.avg(change_percent), Float).label("avg_change_percent"),
+                func.jsonb_agg(
+                    func.jsonb_build_object(
+                        "id", Stock.id,
+                        "symbol", Stock.symbol,
+                        "name", Stock.name,
+                        "current_price", Stock.current_price,
+                        "change_percent", change_percent
+                    ),
+                    type_=JSONB
+                ).label("stocks")
+            )
+            .select_from(Portfolio)
+            .join(Stock, Stock.id == func.any(Portfolio.stock_ids))
+            .where(Portfolio.id == portfolio_id)
+            .group_by(sector)
+            .order_by(allocation_percent.desc())
         )
-        stocks = stock_result.scalars().all()
 
-        if not stocks:
-            return []
-
-        # Group stocks by sector
-        sector_map = {}
-        total_stocks = len(stocks)
-        
-        for stock in stocks:
-            sector = stock.sector or "Unknown"
-            
-            if sector not in sector_map:
-                sector_map[sector] = {
-                    "sector": sector,
-                    "stock_count": 0,
-                    "stocks": [],
-                    "total_change_percent": 0.0
-                }
-            
-            sector_map[sector]["stock_count"] += 1
-            sector_map[sector]["stocks"].append({
-                "id": stock.id,
-                "symbol": stock.symbol,
-                "name": stock.name,
-                "current_price": stock.current_price,
-                "change_percent": stock.change_percent or 0.0
-            })
-            sector_map[sector]["total_change_percent"] += (stock.change_percent or 0.0)
-
-        # Calculate allocation percentages and average performance
-        allocations = []
-        for sector_data in sector_map.values():
-            stock_count = sector_data["stock_count"]
-            allocation_percent = (stock_count / total_stocks) * 100
-            avg_change_percent = sector_data["total_change_percent"] / stock_count if stock_count > 0 else 0.0
-            
-            allocations.append({
-                "sector": sector_data["sector"],
-                "allocation_percent": allocation_percent,
-                "stock_count": stock_count,
-                "avg_change_percent": avg_change_percent,
-                "stocks": sector_data["stocks"]
-            })
-
-        # Sort by allocation percentage descending
-        allocations.sort(key=lambda x: x["allocation_percent"], reverse=True)
+        allocations = [dict(row) for row in result.mappings().all()]
 
         return allocations
 
@@ -258,6 +344,54 @@ class PortfolioService:
 
         return history_entry
 
+    async def log_modifications_bulk(
+        self,
+        db: AsyncSession,
+        entries: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Log many portfolio modifications at once using COPY.
+        
+        Intended for bulk operations such as imports; single changes should
+        go through log_modification.
+        
+        Args:
+            db: Database session
+            entries: Dicts with portfolio_id, action, description and changes
+            
+        Returns:
+            Number of history rows written
+        """
+        if not entries:
+            return 0
+
+        now = datetime.utcnow()
+        records = [
+            (
+                entry["portfolio_id"],
+                entry["action"],
+                entry["description"],
+                json.dumps(entry["changes"]),
+                now
+            )
+            for entry in entries
+        ]
+
+        # COPY runs on the session's own connection. The asyncpg adapter only
+        # opens its transaction when a statement goes through the session, so
+        # issue one first; otherwise a COPY on a fresh session autocommits
+        await db.execute(text("SELECT 1"))
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            PortfolioHistory.__tablename__,
+            records=records,
+            columns=["portfolio_id", "action", "description", "changes", "created_at"]
+        )
+        await db.commit()
+
+        return len(records)
+
     async def get_history(
         self,
         db: AsyncSession,
@@ -318,6 +452,99 @@ class PortfolioService:
         result = await db.execute(query)
         return result.scalars().all()
 
+    async def get_current_values(
+        self,
+        db: AsyncSession,
+        portfolio_ids: List[int]
+    ) -> List[Dict[str, Any]]:
+        """
+        Get holdings market value per portfolio from the materialized view.
+        
+        Args:
+            db: Database session
+            portfolio_ids: IDs of the portfolios to read
+            
+        Returns:
+            List of dicts with portfolio_id, total_value and stock_count
+        """
+        if not portfolio_ids:
+            return []
+
+        result = await db.execute(
+            select(
+                portfolio_current_value.c.portfolio_id,
+                portfolio_current_value.c.total_value,
+                portfolio_current_value.c.stock_count
+            ).where(portfolio_current_value.c.portfolio_id.in_(portfolio_ids))
+        )
+        return [dict(row) for row in result.mappings().all()]
+
+    async def recalculate_holding_values(
+        self,
+        db: AsyncSession,
+        user_id: Optional[int] = None
+    ) -> int:
+        """
+        Recompute holdings' current_value from the latest stock prices.
+        
+        Runs as one set-wise UPDATE ... FROM stocks rather than per holding,
+        and skips holdings whose value is unchanged so they aren't rewritten.
+        
+        Args:
+            db: Database session
+            user_id: Only recompute this user's holdings (defaults to all)
+            
+        Returns:
+            Number of holdings whose value changed
+        """
+        new_value = Holding.quantity * Stock.current_price
+        stmt = (
+            update(Holding)
+            .where(
+                Holding.stock_id == Stock.id,
+                Holding.current_value.is_distinct_from(new_value)
+            )
+            .values(current_value=new_value)
+            .execution_options(synchronize_session=False)
+        )
+        if user_id is not None:
+            stmt = stmt.where(Holding.user_id == user_id)
+
+        result = await db.execute(stmt)
+        await db.commit()
+        return result.rowcount
+
+    async def refresh_current_values(self, db: AsyncSession) -> None:
+        """Refresh the portfolio_current_value materialized view without blocking readers."""
+        await db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY portfolio_current_value"))
+        await db.commit()
+
+    async def ensure_snapshot_partitions(self, db: AsyncSession) -> None:
+        """
+        Roll portfolio_snapshots partitions forward to cover the coming months.
+        
+        Runs at most once per calendar month per process; the database function
+        is idempotent and moves any rows that fell into the default partition.
+        
+        Args:
+            db: Database session
+        """
+        today = datetime.utcnow().date()
+        current_month = (today.year, today.month)
+        if self._partitions_ensured_for == current_month:
+            return
+
+        await db.execute(
+            text(
+                "SELECT create_portfolio_snapshot_partitions("
+                "CAST(:start_date AS date), "
+                "CAST(date_trunc('month', CAST(:start_date AS date)) + make_interval(months => :months) AS date))"
+            ),
+            {"start_date": today, "months": self.SNAPSHOT_PARTITION_MONTHS_AHEAD + 1}
+        )
+        await db.commit()
+        self._partitions_ensured_for = current_month
+
 
 # Create singleton instance
 portfolio_service = PortfolioService()
@@ -10,6 +10,7 @@ from app.models.stock import Stock
 from app.models.portfolio import Portfolio
 from app.models.rebalancing_history import RebalancingHistory
 from app.schemas.rebalancing import RebalancingCalculation, RebalancingAction
+from app.services.stock_service import stock_service
 
 
 class RebalancingService:
@@ -204,9 +205,17 @@ class RebalancingService:
         # Get all portfolios
         portfolio_ids = [alloc["portfolio_id"] for alloc in strategy.portfolio_allocations]
         result = await db.execute(
-            select(Portfolio).where(Portfolio.id.in_(portfolio_ids))
+            select(Portfolio.id).where(Portfolio.id.in_(portfolio_ids))
         )
-        portfolios = {p.id: p for p in result.scalars().all()}
+        existing_portfolio_ids = set(result.scalars().all())
+        
+        # Preload every distinct stock across all allocations in one query
+        all_stock_ids = {
+            int(sid)
+            for alloc in strategy.portfolio_allocations
+            for sid in alloc["stock_allocations"].keys()
+        }
+        stocks = await stock_service.get_stocks_by_ids(db, all_stock_ids)
         
         # Process each portfolio allocation
         for alloc in strategy.portfolio_allocations:
@@ -214,20 +223,12 @@ class RebalancingService:
             portfolio_percentage = alloc["percentage"]
             stock_allocations = alloc["stock_allocations"]
             
-            portfolio = portfolios.get(portfolio_id)
-            if not portfolio:
+            if portfolio_id not in existing_portfolio_ids:
                 continue
             
             # Calculate funds for this portfolio
             portfolio_funds = total_value * (portfolio_percentage / 100.0)
             
-            # Get stock prices
-            stock_ids = [int(sid) for sid in stock_allocations.keys()]
-            stock_result = await db.execute(
-                select(Stock).where(Stock.id.in_(stock_ids))
-            )
-            stocks = {s.id: s for s in stock_result.scalars().all()}
-            
             # Calculate target quantity for each stock
             for stock_id_str, stock_percentage in stock_allocations.items():
                 stock_id = int(stock_id_str)
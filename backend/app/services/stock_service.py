@@ -0,0 +1,28 @@
+from typing import Dict, Iterable
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.models.stock import Stock
+
+
+class StockService:
+    """Shared stock lookups used across portfolios, strategies and holdings"""
+
+    async def get_stocks_by_ids(
+        self,
+        db: AsyncSession,
+        stock_ids: Iterable[int]
+    ) -> Dict[int, Stock]:
+        """Load stocks keyed by id with one de-duplicated IN query (no query for no ids)"""
+        unique_ids = set(stock_ids)
+        if not unique_ids:
+            return {}
+
+        result = await db.execute(
+            select(Stock).where(Stock.id.in_(unique_ids))
+        )
+        return {stock.id: stock for stock in result.scalars().all()}
+
+
+# Create singleton instance
+stock_service = StockService()
@@ -1,6 +1,7 @@
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import case, func, insert, literal, select, update
+from typing import Optional
 from math import floor
 
 from app.models.strategy import Strategy
@@ -8,6 +9,7 @@ from app.models.holding import Holding
 from app.models.stock import Stock
 from app.models.portfolio import Portfolio
 from app.models.strategy_snapshot import StrategySnapshot
+from app.services.stock_service import stock_service
 
 
 class StrategyService:
@@ -19,9 +21,17 @@ class StrategyService:
         # Get all portfolios in the strategy
         portfolio_ids = [alloc["portfolio_id"] for alloc in strategy.portfolio_allocations]
         result = await db.execute(
-            select(Portfolio).where(Portfolio.id.in_(portfolio_ids))
+            select(Portfolio.id).where(Portfolio.id.in_(portfolio_ids))
         )
-        portfolios = {p.id: p for p in result.scalars().all()}
+        existing_portfolio_ids = set(result.scalars().all())
+        
+        # Preload every distinct stock across all allocations in one query
+        all_stock_ids = {
+            int(sid)
+            for alloc in strategy.portfolio_allocations
+            for sid in alloc["stock_allocations"].keys()
+        }
+        stocks = await stock_service.get_stocks_by_ids(db, all_stock_ids)
         
         # Calculate holdings for each portfolio
         for alloc in strategy.portfolio_allocations:
@@ -29,20 +39,12 @@ class StrategyService:
             portfolio_percentage = alloc["percentage"]
             stock_allocations = alloc["stock_allocations"]
             
-            portfolio = portfolios.get(portfolio_id)
-            if not portfolio:
+            if portfolio_id not in existing_portfolio_ids:
                 continue
             
             # Calculate funds for this portfolio
             portfolio_funds = strategy.total_funds * (portfolio_percentage / 100.0)
             
-            # Get stock prices
-            stock_ids = [int(sid) for sid in stock_allocations.keys()]
-            stock_result = await db.execute(
-                select(Stock).where(Stock.id.in_(stock_ids))
-            )
-            stocks = {s.id: s for s in stock_result.scalars().all()}
-            
             # Calculate holdings for each stock in the portfolio
             for stock_id_str, stock_percentage in stock_allocations.items():
                 stock_id = int(stock_id_str)
@@ -116,19 +118,50 @@ class StrategyService:
         db.add(snapshot)
         await db.commit()
     
-    async def update_holdings_current_value(self, db: AsyncSession, strategy_id: int):
-        """Update current value of all holdings based on latest stock prices"""
+    async def create_snapshots_bulk(
+        self,
+        db: AsyncSession,
+        snapshot_date: Optional[datetime] = None
+    ) -> int:
+        """Snapshot every strategy with one INSERT ... SELECT; returns the number of snapshots"""
+        if snapshot_date is None:
+            snapshot_date = datetime.utcnow()
         
-        holdings_result = await db.execute(
-            select(Holding, Stock)
-            .join(Stock, Holding.stock_id == Stock.id)
-            .where(Holding.strategy_id == strategy_id)
+        # Same figures as create_snapshot, aggregated per strategy in the database
+        holdings_value = (
+            select(Holding.strategy_id, func.sum(Holding.current_value).label("value"))
+            .where(Holding.strategy_id.is_not(None))
+            .group_by(Holding.strategy_id)
+            .subquery()
+        )
+        total_value = func.coalesce(holdings_value.c.value, 0.0) + Strategy.remaining_cash
+        performance_percentage = case(
+            (Strategy.total_funds > 0, (total_value - Strategy.total_funds) / Strategy.total_funds * 100),
+            else_=0.0
         )
-        holdings_with_stocks = holdings_result.all()
         
-        for holding, stock in holdings_with_stocks:
-            holding.current_value = holding.quantity * stock.current_price
+        result = await db.execute(
+            insert(StrategySnapshot).from_select(
+                ["strategy_id", "total_value", "performance_percentage", "snapshot_date"],
+                select(Strategy.id, total_value, performance_percentage, literal(snapshot_date))
+                .outerjoin(holdings_value, holdings_value.c.strategy_id == Strategy.id)
+            )
+        )
+        await db.commit()
+        return result.rowcount
+    
+    async def update_holdings_current_value(self, db: AsyncSession, strategy_id: int):
+        """Update current value of all holdings based on latest stock prices"""
         
+        await db.execute(
+            update(Holding)
+            .where(
+                Holding.strategy_id == strategy_id,
+                Holding.stock_id == Stock.id
+            )
+            .values(current_value=Holding.quantity * Stock.current_price)
+            .execution_options(synchronize_session=False)
+        )
         await db.commit()
 
 
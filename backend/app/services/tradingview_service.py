@@ -8,17 +8,24 @@ Package Usage:
 """
 
 import asyncio
-from typing import List, Dict, Optional
+import anyio.to_thread
+from functools import lru_cache, partial
+from typing import Any, Awaitable, Callable, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 import logging
 import os
 import re
+import time
 import pandas as pd
 
 # Package imports
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from tradingview_screener import Query, col
+from tradingview_screener.query import DEFAULT_RANGE as SCREENER_DEFAULT_RANGE, HEADERS as SCREENER_HEADERS
 from tvDatafeed import TvDatafeed, Interval as TvInterval
 from tradingview_scraper.symbols.ideas import Ideas
 from tradingview_scraper.symbols.technicals import Indicators
@@ -30,6 +37,58 @@ from app.models.tradingview_credential import TradingViewCredential
 
 logger = logging.getLogger(__name__)
 
+# Screener requests share one keep-alive pool instead of a new TLS
+# connection per call; (connect, read) timeouts in seconds
+SCREENER_POOL_SIZE = 40
+SCREENER_TIMEOUT = (2.0, 20.0)
+
+_screener_session = requests.Session()
+_screener_session.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=SCREENER_POOL_SIZE,
+    # Back off exponentially when TradingView rate-limits us (429)
+    max_retries=Retry(
+        total=3,
+        status_forcelist=(429,),
+        allowed_methods=None,
+        backoff_factor=0.5,
+        raise_on_status=False
+    )
+))
+
+
+class ScreenerQuery(Query):
+    """tradingview_screener Query that posts through the shared pooled session"""
+    
+    def get_scanner_data_raw(self, **kwargs):
+        # Same request as Query.get_scanner_data_raw, minus the one-off requests.post
+        self.query.setdefault('range', SCREENER_DEFAULT_RANGE.copy())
+        kwargs.setdefault('headers', SCREENER_HEADERS)
+        kwargs.setdefault('timeout', SCREENER_TIMEOUT)
+        
+        r = _screener_session.post(self.url, json=self.query, **kwargs)
+        
+        if not r.ok:
+            # Keep the body in the error message, as the library does
+            r.reason += f'\n Body: {r.text}\n'
+            r.raise_for_status()
+        
+        return r.json()
+
+
+FALLBACK_LOGO_COLORS = (
+    "0D47A1", "1976D2", "388E3C", "7B1FA2", "C2185B",
+    "F57C00", "0097A7", "00796B", "E64A19", "5D4037",
+    "455A64", "1565C0", "2E7D32", "6A1B9A", "AD1457"
+)
+
+
+# Called for every logo-less row on each sync; the URL only depends on the symbol
+@lru_cache(maxsize=4096)
+def _fallback_logo_url(symbol: str) -> str:
+    color = FALLBACK_LOGO_COLORS[hash(symbol) % len(FALLBACK_LOGO_COLORS)]
+    return f"https://ui-avatars.com/api/?name={symbol}&background={color}&color=fff&size=128&bold=true&font-size=0.4"
+
 
 class TradingViewService:
     """
@@ -41,9 +100,24 @@ class TradingViewService:
     - Trading ideas, news, and technical indicators (tradingview_scraper)
     """
     
+    # Seconds proxied TradingView results are reused for, by kind
+    HISTORY_CACHE_TTL = 300.0
+    NEWS_CACHE_TTL = 600.0
+    SCRAPER_CACHE_TTL = 300.0
+    CALENDAR_CACHE_TTL = 3600.0
+    CACHE_MAX_SIZE = 1024
+    # Outbound TradingView calls allowed at once, to stay under its rate limits
+    MAX_CONCURRENT_CALLS = 15
+    
     def __init__(self):
         self.initialized = False
         self.cookies = self._load_cookies()
+        # (method name, args, kwargs) -> (expires_at, result)
+        self._cache: Dict[Tuple, Tuple[float, Any]] = {}
+        # Same keys -> fetches currently running
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        # Caps outbound TradingView calls across all methods
+        self._limiter = asyncio.Semaphore(self.MAX_CONCURRENT_CALLS)
         
         # Initialize tvdatafeed for historical data (without login by default)
         try:
@@ -119,6 +193,63 @@ class TradingViewService:
             self.tv = TvDatafeed()
             return False
     
+    async def _call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run a blocking TradingView client call in a worker thread, MAX_CONCURRENT_CALLS at a time"""
+        async with self._limiter:
+            return await anyio.to_thread.run_sync(partial(func, *args, **kwargs))
+    
+    async def cached(
+        self,
+        ttl: float,
+        fetch: Callable[..., Awaitable[Any]],
+        *args,
+        **kwargs
+    ) -> Any:
+        """Call fetch(*args, **kwargs), reusing a non-empty result for ttl seconds"""
+        key = (fetch.__name__, args, frozenset(kwargs.items()))
+        cached = self._cache.get(key)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        # Identical calls made while a fetch is running share its result
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_and_cache(key, ttl, fetch, args, kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        
+        # One caller going away must not cancel the fetch for the others
+        return await asyncio.shield(task)
+    
+    async def _fetch_and_cache(
+        self,
+        key: Tuple,
+        ttl: float,
+        fetch: Callable[..., Awaitable[Any]],
+        args: Tuple,
+        kwargs: Dict[str, Any]
+    ) -> Any:
+        result = await fetch(*args, **kwargs)
+        
+        # Failed fetches come back empty; don't hold on to those
+        if result:
+            now = time.monotonic()
+            if len(self._cache) >= self.CACHE_MAX_SIZE:
+                # Drop expired entries, then the oldest if still full
+                for stale in [stale for stale, (expires_at, _) in self._cache.items() if expires_at <= now]:
+                    del self._cache[stale]
+                if len(self._cache) >= self.CACHE_MAX_SIZE:
+                    del self._cache[next(iter(self._cache))]
+            self._cache[key] = (now + ttl, result)
+        
+        return result
+    
+    def invalidate_cache(self, *fetches: Callable[..., Awaitable[Any]]) -> None:
+        """Drop cached results of the given methods"""
+        names = {fetch.__name__ for fetch in fetches}
+        for key in [key for key in self._cache if key[0] in names]:
+            del self._cache[key]
+    
     def _load_cookies(self) -> Optional[Dict]:
         """
         Load TradingView session cookies for real-time data access.
@@ -175,11 +306,11 @@ class TradingViewService:
             cookies = {'sessionid': session_id}
             
             # Test with a simple query to check update_mode
-            count, df = (Query()
+            screener_query = (ScreenerQuery()
                 .set_markets('egypt')
                 .select('name', 'update_mode')
-                .limit(1)
-                .get_scanner_data(cookies=cookies))
+                .limit(1))
+            count, df = await self._call(screener_query.get_scanner_data, cookies=cookies)
             
             if df is not None and not df.empty:
                 update_mode = df['update_mode'].iloc[0] if 'update_mode' in df.columns else 'unknown'
@@ -232,7 +363,7 @@ class TradingViewService:
             logger.info(f"Fetching all EGX stocks from TradingView screener... (Using {'user' if cookies and db else 'default'} cookies)")
             
             # Select fields that work with EGX market (tested in Phase 1)
-            count, df = (Query()
+            screener_query = (ScreenerQuery()
                 .set_markets('egypt')
                 .select(
                     'name', 'description', 'close', 'open', 'high', 'low', 'volume',
@@ -245,8 +376,8 @@ class TradingViewService:
                     'return_on_assets', 'return_on_invested_capital'
                 )
                 .order_by('market_cap_basic', ascending=False)
-                .limit(500)
-                .get_scanner_data(cookies=cookies))
+                .limit(500))
+            count, df = await self._call(screener_query.get_scanner_data, cookies=cookies)
             
             if df is None or df.empty:
                 logger.error("No data returned from TradingView screener")
@@ -319,12 +450,12 @@ class TradingViewService:
     async def get_stock_price(self, symbol: str, exchange: str = "EGX") -> float:
         """Get current stock price for a specific symbol using tradingview_screener"""
         try:
-            count, df = (Query()
+            screener_query = (ScreenerQuery()
                 .set_markets('egypt')
                 .select('name', 'close')
                 .where(col('name') == symbol)
-                .limit(1)
-                .get_scanner_data(cookies=self.cookies))
+                .limit(1))
+            count, df = await self._call(screener_query.get_scanner_data, cookies=self.cookies)
             
             if df is not None and not df.empty:
                 return float(df['close'].iloc[0])
@@ -338,7 +469,7 @@ class TradingViewService:
     async def get_stock_data(self, symbol: str, exchange: str = "EGX") -> Dict:
         """Get comprehensive stock data for a specific symbol using tradingview_screener"""
         try:
-            count, df = (Query()
+            screener_query = (ScreenerQuery()
                 .set_markets('egypt')
                 .select(
                     'name', 'description', 'close', 'open', 'high', 'low', 'volume',
@@ -346,8 +477,8 @@ class TradingViewService:
                     'market_cap_basic'
                 )
                 .where(col('name') == symbol)
-                .limit(1)
-                .get_scanner_data(cookies=self.cookies))
+                .limit(1))
+            count, df = await self._call(screener_query.get_scanner_data, cookies=self.cookies)
             
             if df is None or df.empty:
                 return {}
@@ -395,7 +526,7 @@ class TradingViewService:
         Returns comprehensive financial metrics for display on stock details page.
         """
         try:
-            count, df = (Query()
+            screener_query = (ScreenerQuery()
                 .set_markets('egypt')
                 .select(
                     'name', 'market_cap_basic', 'price_earnings_ttm',
@@ -405,8 +536,8 @@ class TradingViewService:
                     'quick_ratio', 'return_on_assets', 'return_on_invested_capital'
                 )
                 .where(col('name') == symbol)
-                .limit(1)
-                .get_scanner_data(cookies=self.cookies))
+                .limit(1))
+            count, df = await self._call(screener_query.get_scanner_data, cookies=self.cookies)
             
             if df is None or df.empty:
                 return {}
@@ -444,7 +575,7 @@ class TradingViewService:
             symbols = [stock.symbol for stock in stocks]
             
             # Fetch comprehensive price data including OHLC and fundamentals
-            count, df = (Query()
+            screener_query = (ScreenerQuery()
                 .set_markets('egypt')
                 .select(
                     'name', 'close', 'open', 'high', 'low', 'volume',
@@ -454,8 +585,8 @@ class TradingViewService:
                     'return_on_equity', 'debt_to_equity', 'current_ratio', 'quick_ratio'
                 )
                 .where(col('name').isin(symbols))
-                .limit(500)
-                .get_scanner_data(cookies=self.cookies))
+                .limit(500))
+            count, df = await self._call(screener_query.get_scanner_data, cookies=self.cookies)
             
             if df is not None and not df.empty:
                 # Update stocks with full OHLC data
@@ -551,7 +682,7 @@ class TradingViewService:
         try:
             logger.info(f"Searching TradingView for: {query}")
             
-            count, df = (Query()
+            screener_query = (ScreenerQuery()
                 .set_markets('egypt')
                 .select(
                     'name', 'description', 'close', 'open', 'high', 'low', 'volume',
@@ -559,8 +690,8 @@ class TradingViewService:
                     'sector', 'industry', 'market_cap_basic'
                 )
                 .order_by('market_cap_basic', ascending=False)
-                .limit(500)
-                .get_scanner_data(cookies=self.cookies))
+                .limit(500))
+            count, df = await self._call(screener_query.get_scanner_data, cookies=self.cookies)
             
             if df is None or df.empty:
                 logger.warning("No results found from TradingView")
@@ -680,16 +811,13 @@ class TradingViewService:
             logger.info(f"Fetching {n_bars} bars of {symbol} data from EGX with {tv_interval.name} interval")
             
             try:
-                # Run in executor to avoid blocking async loop
-                loop = asyncio.get_event_loop()
-                df = await loop.run_in_executor(
-                    None,
-                    lambda: self.tv.get_hist(
-                        symbol=symbol,
-                        exchange='EGX',
-                        interval=tv_interval,
-                        n_bars=n_bars
-                    )
+                # Run in a worker thread to avoid blocking async loop
+                df = await self._call(
+                    self.tv.get_hist,
+                    symbol=symbol,
+                    exchange='EGX',
+                    interval=tv_interval,
+                    n_bars=n_bars
                 )
                 
                 if df is not None and not df.empty:
@@ -746,7 +874,8 @@ class TradingViewService:
             pages_needed = max(1, (limit + 19) // 20)
             
             # Scrape ideas for the symbol
-            ideas = ideas_scraper.scrape(
+            ideas = await self._call(
+                ideas_scraper.scrape,
                 symbol=symbol,
                 startPage=1,
                 endPage=pages_needed,
@@ -788,9 +917,10 @@ class TradingViewService:
             indicators_scraper = Indicators(export_result=False, export_type='json')
             
             # Get all indicators
-            result = indicators_scraper.scrape(
+            result = await self._call(
+                indicators_scraper.scrape,
                 exchange=exchange,
-                        symbol=symbol,
+                symbol=symbol,
                 timeframe=timeframe,
                 allIndicators=True
             )
@@ -829,7 +959,8 @@ class TradingViewService:
             news_scraper = NewsScraper(export_result=False, export_type='json')
             
             # Get news headlines
-            news_headlines = news_scraper.scrape_headlines(
+            news_headlines = await self._call(
+                news_scraper.scrape_headlines,
                 symbol=symbol,
                 exchange=exchange,
                 sort='latest'
@@ -851,7 +982,8 @@ class TradingViewService:
                     
                     # Get full content for each news item
                     if 'storyPath' in clean_headline:
-                        content = news_scraper.scrape_news_content(
+                        content = await self._call(
+                            news_scraper.scrape_news_content,
                             story_path=clean_headline['storyPath']
                         )
                         
@@ -946,7 +1078,7 @@ class TradingViewService:
         try:
             news_scraper = NewsScraper(export_result=False, export_type='json')
             
-            content = news_scraper.scrape_news_content(story_path=story_path)
+            content = await self._call(news_scraper.scrape_news_content, story_path=story_path)
             
             if content and isinstance(content, dict):
                 logger.info(f"Fetched news content for {story_path}")
@@ -1013,7 +1145,8 @@ class TradingViewService:
             calendar_scraper = CalendarScraper()
             
             # Get upcoming earnings
-            earnings = calendar_scraper.scrape_earnings(
+            earnings = await self._call(
+                calendar_scraper.scrape_earnings,
                 values=["logoid", "name", "earnings_per_share_fq", "market_cap_basic"]
             )
             
@@ -1045,7 +1178,8 @@ class TradingViewService:
             calendar_scraper = CalendarScraper()
             
             # Get upcoming dividends
-            dividends = calendar_scraper.scrape_dividends(
+            dividends = await self._call(
+                calendar_scraper.scrape_dividends,
                 values=["logoid", "name", "dividends_yield", "market_cap_basic"]
             )
             
@@ -1066,15 +1200,7 @@ class TradingViewService:
     
     def _generate_logo_url(self, symbol: str) -> str:
         """Generate a color-coded fallback logo URL for a stock symbol"""
-        colors = [
-            "0D47A1", "1976D2", "388E3C", "7B1FA2", "C2185B",
-            "F57C00", "0097A7", "00796B", "E64A19", "5D4037",
-            "455A64", "1565C0", "2E7D32", "6A1B9A", "AD1457"
-        ]
-        color_index = hash(symbol) % len(colors)
-        color = colors[color_index]
-        
-        return f"https://ui-avatars.com/api/?name={symbol}&background={color}&color=fff&size=128&bold=true&font-size=0.4"
+        return _fallback_logo_url(symbol)
     
     async def initialize_egx_stocks(self, db: AsyncSession):
         """Initialize EGX stocks in the database on first run"""
@@ -1082,7 +1208,7 @@ class TradingViewService:
             return
         
         # Check if we already have stocks
-        result = await db.execute(select(Stock).limit(1))
+        result = await db.execute(select(Stock.id).limit(1))
         existing_stock = result.scalar_one_or_none()
         
         if existing_stock: